@@ -1,4 +1,5 @@
 import pygame
+DEBUG = False#set True to print debug info
 pygame.init()
 screen = pygame.display.set_mode((0,0) ,pygame.FULLSCREEN)#this works 
 clock =pygame.time.Clock()
@@ -6,37 +7,40 @@ swidth, sheight = screen.get_size()
 font=pygame.font.SysFont(None,30)
 
 pygame.display.set_caption("Orbit Simulation")
-print (f"Screen size: {swidth}x{sheight}")#for debugimg
+if DEBUG:
+    print (f"Screen size: {swidth}x{sheight}")#for debugimg
 running = True
+frame = 0
+fpstxt = font.render("Fps :0",True,(255,255,255))
 def up():#updates the screen wheneveranything has done drawing
     pygame.display.flip()  # Update the display
 while running:
     screen.fill((0,0,0))  # Clear the screen with black
 
     dt =clock.tick(60)
+    mx,my = pygame.mouse.get_pos()#pos of mouse in (x,y), once per frame
+    posx,posy=mx,my
     for event in pygame.event.get():
-        mx,my = pygame.mouse.get_pos()#pos of mouse in (x,y)    
-        posx,posy=mx,my
         if event.type == pygame.QUIT:
             running = False
         elif event.type == pygame.KEYDOWN:
-            print(pygame.key.name(event.key),"=",event.key)#debug
+            if DEBUG:
+                print(pygame.key.name(event.key),"=",event.key)#debug
 
             if event.key == 27:#27 is the int value for the escape key
                 running = False
                 
-            if event.key == 9:#9 is the int value for the tab key
+            if event.key == 9 and DEBUG:#9 is the int value for the tab key
                 print(f"Mouse position: {mx}, {my}")  # Print mouse position for debugging
-                
-        if pygame.mouse.get_pressed()==(True,False,False) : 
-            print("mouse pressed")
-            if mx>680:      
-                if mx<790:
-                    if my>386 :
-                        if my<484 :
-                            running = False
-    fps =int(clock.get_fps())
-    fpstxt = font.render(f"Fps :{fps}",True,(255,255,255))
+
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:#left click
+            cx,cy = event.pos
+            if 680 < cx < 790 and 386 < cy < 484:
+                running = False
+    frame += 1
+    if frame % 10 == 0:#only re-render the fps text every 10 frames
+        fps =int(clock.get_fps())
+        fpstxt = font.render(f"Fps :{fps}",True,(255,255,255))
     screen.blit(fpstxt,(20,10)   )        
             
     
@@ -1,6 +1,8 @@
 import pygame
+import numpy as np
 import math
 import sys
+from collections import deque
 
 # Initialize Pygame
 pygame.init()
@@ -10,6 +12,13 @@ WIDTH, HEIGHT = 1200, 800
 G = 6.67428e-11  # Gravitational constant (scaled for simulation)
 SCALE = 1e-10    # Scale factor for display
 TIMESTEP = 86400  # 1 day in seconds (can be adjusted)
+TRAIL_FADE = 2  # Alpha removed from the trail surface each step
+TRAIL_FADE_STEPS = -(-255 // TRAIL_FADE)  # Steps until a trail segment has faded out
+SCREEN_LIMIT = 1 << 20  # Screen coordinates are clamped to this many pixels
+BARNES_HUT_THRESHOLD = 12000  # Use the quadtree above this many bodies
+THETA = 0.5  # Barnes-Hut opening angle (smaller is more accurate)
+FLOAT = np.float32  # Precision of the simulation state and force kernel
+DIRECT_BLOCK = 64  # Rows per tile of the direct-sum kernel, keeps the scratch cache-sized
 
 # Colors
 BLACK = (0, 0, 0)
@@ -21,6 +30,49 @@ GREEN = (0, 255, 0)
 GRAY = (128, 128, 128)
 ORANGE = (255, 165, 0)
 
+_circle_sprites = {}
+
+def circle_sprite(radius, color, width=0):
+    """Return a cached per-pixel-alpha surface with a circle centered at (radius, radius)"""
+    key = (radius, color, width)
+    sprite = _circle_sprites.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius, width)
+        sprite = sprite.convert_alpha()
+        _circle_sprites[key] = sprite
+    return sprite
+
+def render_text(font, text, color):
+    """Render antialiased text already converted to the display's pixel format"""
+    return font.render(text, True, color).convert_alpha()
+
+def pairwise_accelerations(pos, gm, rows, d, r2, inv_r, acc):
+    """Direct-sum gravitational accelerations of the bodies listed in rows.
+
+    Works on plain arrays only: pos (N, 2), gm (N,) = G * mass and the M row indices
+    are read, while d (M, N, 2), r2 (M, N), inv_r (M, N) and acc (M, 2) are
+    scratch/output buffers that are overwritten. Returns acc.
+    """
+    # d[k, j] points from body rows[k] to body j
+    np.subtract(pos[None, :, :], pos[rows, None, :], out=d)
+    np.einsum('ijk,ijk->ij', d, d, out=r2)
+
+    # Coincident pairs (including i == j) contribute no force
+    r2[r2 == 0] = np.inf
+
+    # 1/r^3 as a reciprocal square root cubed: one sqrt and one division
+    # per pair instead of a fractional pow
+    np.sqrt(r2, out=inv_r)
+    np.reciprocal(inv_r, out=inv_r)
+    np.multiply(inv_r, inv_r, out=r2)
+    r2 *= inv_r
+    r2 *= gm[None, :]
+
+    # a_k = sum_j G m_j * d_kj / r_kj^3, reduced without an (N, N, 2) temporary
+    np.einsum('ijk,ij->ik', d, r2, out=acc)
+    return acc
+
 class Slider:
     """A simple slider UI component for adjusting parameters"""
     def __init__(self, x, y, w, h, min_val, max_val, initial_val, label):
@@ -30,8 +82,13 @@ class Slider:
         self.val = initial_val
         self.label = label
         self.dragging = False
+        self.dirty = True  # Value changed since the simulation last read it
         self.button_rect = pygame.Rect(x + int((initial_val - min_val) / (max_val - min_val) * w) - 5, y - 5, 10, h + 10)
 
+        # Label surface, re-rendered only when the displayed value changes
+        self.text = None
+        self.text_surface = None
+
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.button_rect.collidepoint(event.pos):
@@ -44,103 +101,173 @@ class Slider:
                 rel_x = max(0, min(rel_x, self.rect.width))
                 self.val = self.min_val + (rel_x / self.rect.width) * (self.max_val - self.min_val)
                 self.button_rect.centerx = self.rect.x + rel_x
+                self.dirty = True
 
     def draw(self, screen, font):
+        """Draw the slider and return the screen area it covers"""
         # Draw slider track
-        pygame.draw.rect(screen, GRAY, self.rect)
+        track_rect = pygame.draw.rect(screen, GRAY, self.rect)
         # Draw slider button
-        pygame.draw.rect(screen, WHITE, self.button_rect)
+        button_rect = pygame.draw.rect(screen, WHITE, self.button_rect)
         # Draw label and value
-        text = font.render(f"{self.label}: {self.val:.2e}", True, WHITE)
-        screen.blit(text, (self.rect.x, self.rect.y - 25))
+        text = f"{self.label}: {self.val:.2e}"
+        if text != self.text:
+            self.text = text
+            self.text_surface = render_text(font, text, WHITE)
+        text_rect = screen.blit(self.text_surface, (self.rect.x, self.rect.y - 25))
+        return track_rect.unionall([button_rect, text_rect])
+
+class QuadTree:
+    """Barnes-Hut quadtree node holding the total mass and center of mass of its bodies"""
+    MAX_DEPTH = 32  # Coincident bodies are merged instead of split forever
+
+    def __init__(self, cx, cy, half):
+        self.cx = cx
+        self.cy = cy
+        self.half = half
+        self.mass = 0.0
+        self.com_x = 0.0
+        self.com_y = 0.0
+        self.indices = []  # Bodies held by a leaf (more than one only at MAX_DEPTH)
+        self.children = None
+
+    @classmethod
+    def build(cls, pos, mass):
+        """Build a tree covering every position"""
+        # The tree works in Python floats: mass * position overflows float32
+        # once the sun is heavy and away from the origin
+        lo = pos.min(axis=0).tolist()
+        hi = pos.max(axis=0).tolist()
+        half = max(hi[0] - lo[0], hi[1] - lo[1]) / 2 or 1.0
+        root = cls((lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2, half)
+        for i, ((x, y), m) in enumerate(zip(pos.tolist(), mass.tolist())):
+            root.insert(i, x, y, m)
+        return root
+
+    def insert(self, i, x, y, m, depth=0):
+        if self.children is not None:
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        elif self.indices and depth < self.MAX_DEPTH:
+            # Occupied leaf: split and push the existing body down
+            self.children = [QuadTree(self.cx + dx * self.half / 2, self.cy + dy * self.half / 2, self.half / 2)
+                             for dy in (-1, 1) for dx in (-1, 1)]
+            self._child_for(self.com_x, self.com_y).insert(self.indices.pop(), self.com_x, self.com_y, self.mass, depth + 1)
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        else:
+            # Empty leaf, or coincident bodies at the depth limit
+            self.indices.append(i)
+
+        # Update total mass and center of mass
+        total = self.mass + m
+        self.com_x = (self.com_x * self.mass + x * m) / total
+        self.com_y = (self.com_y * self.mass + y * m) / total
+        self.mass = total
+
+    def _child_for(self, x, y):
+        return self.children[(2 if y >= self.cy else 0) + (1 if x >= self.cx else 0)]
+
+    def acceleration(self, i, x, y, theta):
+        """Gravitational acceleration on body i at (x, y)"""
+        ax = ay = 0.0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.mass == 0 or i in node.indices:
+                continue
+            dx = node.com_x - x
+            dy = node.com_y - y
+            r2 = dx * dx + dy * dy
+            if r2 == 0:
+                continue
+            # Far enough away (width / distance < theta): treat the node as one body
+            if node.children is None or 4 * node.half * node.half < theta * theta * r2:
+                inv_r = 1.0 / math.sqrt(r2)
+                f = node.mass * inv_r * inv_r * inv_r
+                ax += f * dx
+                ay += f * dy
+            else:
+                stack.extend(node.children)
+        return G * ax, G * ay
 
 class Body:
-    """Class representing a celestial body with mass, position, velocity"""
-    def __init__(self, x, y, radius, color, mass, name="Body"):
-        self.x = x
-        self.y = y
+    """Class representing a celestial body; its physical state lives in the simulation's arrays"""
+    def __init__(self, sim, idx, radius, color, name="Body"):
+        self.sim = sim
+        self.idx = idx
         self.radius = radius
         self.color = color
-        self.mass = mass
         self.name = name
 
-        self.orbit_trail = []
-        self.is_sun = False
+        self.name_surface = None  # Rendered on first draw
+        self.sprite = circle_sprite(max(radius, 3), color)
 
-        self.vx = 0  # velocity in x direction
-        self.vy = 0  # velocity in y direction
+    # Position, velocity and mass are views into the simulation's SoA arrays
+    @property
+    def x(self):
+        return self.sim.pos[self.idx, 0]
 
-    def draw(self, screen, font):
-        # Convert real coordinates to screen coordinates
-        screen_x = int(self.x * SCALE + WIDTH // 2)
-        screen_y = int(self.y * SCALE + HEIGHT // 2)
-
-        # Draw orbit trail
-        if len(self.orbit_trail) > 2:
-            trail_points = []
-            for point in self.orbit_trail[-500:]:  # Limit trail length
-                trail_x = int(point[0] * SCALE + WIDTH // 2)
-                trail_y = int(point[1] * SCALE + HEIGHT // 2)
-                if 0 <= trail_x < WIDTH and 0 <= trail_y < HEIGHT:
-                    trail_points.append((trail_x, trail_y))
-            if len(trail_points) > 1:
-                pygame.draw.lines(screen, self.color, False, trail_points, 2)
+    @x.setter
+    def x(self, value):
+        self.sim.pos[self.idx, 0] = value
 
-        # Draw the body
-        if 0 <= screen_x < WIDTH and 0 <= screen_y < HEIGHT:
-            pygame.draw.circle(screen, self.color, (screen_x, screen_y), max(self.radius, 3))
+    @property
+    def y(self):
+        return self.sim.pos[self.idx, 1]
 
-            # Draw name label
-            text = font.render(self.name, True, WHITE)
-            screen.blit(text, (screen_x + 15, screen_y - 10))
+    @y.setter
+    def y(self, value):
+        self.sim.pos[self.idx, 1] = value
 
-    def gravitational_force(self, other):
-        """Calculate gravitational force between this body and another"""
-        dx = other.x - self.x
-        dy = other.y - self.y
-        distance = math.sqrt(dx**2 + dy**2)
+    @property
+    def vx(self):
+        return self.sim.vel[self.idx, 0]
 
-        if distance == 0:
-            return 0, 0
+    @vx.setter
+    def vx(self, value):
+        self.sim.vel[self.idx, 0] = value
 
-        # F = G * m1 * m2 / r^2
-        force_magnitude = G * self.mass * other.mass / distance**2
+    @property
+    def vy(self):
+        return self.sim.vel[self.idx, 1]
 
-        # Calculate force components
-        fx = force_magnitude * dx / distance
-        fy = force_magnitude * dy / distance
+    @vy.setter
+    def vy(self, value):
+        self.sim.vel[self.idx, 1] = value
 
-        return fx, fy
+    @property
+    def mass(self):
+        return self.sim.mass[self.idx]
 
-    def update_position(self, bodies, timestep):
-        """Update position using Verlet integration"""
-        if self.is_sun:
-            return
+    @mass.setter
+    def mass(self, value):
+        self.sim.mass[self.idx] = value
+        self.sim.gm = None
+        self.sim.acc = None
 
-        total_fx = 0
-        total_fy = 0
+    @property
+    def is_sun(self):
+        return self.sim.is_sun[self.idx]
 
-        # Calculate net force from all other bodies
-        for body in bodies:
-            if body != self:
-                fx, fy = self.gravitational_force(body)
-                total_fx += fx
-                total_fy += fy
+    @is_sun.setter
+    def is_sun(self, value):
+        self.sim.is_sun[self.idx] = value
+        self.sim.update_movable()
 
-        # Calculate acceleration: a = F/m
-        ax = total_fx / self.mass
-        ay = total_fy / self.mass
+    def draw(self, screen, font, screen_x, screen_y):
+        """Draw the body and its label, returning the screen rects touched"""
+        rects = []
 
-        # Update velocity: v = v + a*t
-        self.vx += ax * timestep
-        self.vy += ay * timestep
+        # Draw the body
+        if 0 <= screen_x < WIDTH and 0 <= screen_y < HEIGHT:
+            r = max(self.radius, 3)
+            rects.append(screen.blit(self.sprite, (screen_x - r, screen_y - r)))
 
-        # Update position: x = x + v*t
-        self.x += self.vx * timestep
-        self.y += self.vy * timestep
+            # Draw name label
+            if self.name_surface is None:
+                self.name_surface = render_text(font, self.name, WHITE)
+            rects.append(screen.blit(self.name_surface, (screen_x + 15, screen_y - 10)))
 
-        # Add to orbit trail
-        self.orbit_trail.append((self.x, self.y))
+        return rects
 
 class OrbitSimulation:
     """Main simulation class"""
@@ -148,15 +275,25 @@ class OrbitSimulation:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("2D Orbital Mechanics Simulation")
         self.clock = pygame.time.Clock()
+
+        # Drop event types the simulation never looks at before they are queued
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN,
+                                  pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION,
+                                  pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE])
         self.font = pygame.font.Font(None, 24)
         self.small_font = pygame.font.Font(None, 18)
 
         self.running = True
         self.paused = False
+        self.timestep = TIMESTEP
+        self.scale = SCALE
 
-        # Create bodies
+        # Create bodies; their state is stored as structure-of-arrays
         self.bodies = []
+        self.clear_state()
         self.setup_solar_system()
+        self.update_screen_positions()
 
         # Create UI sliders
         self.sliders = [
@@ -166,36 +303,115 @@ class OrbitSimulation:
             Slider(10, 200, 200, 20, 10000, 50000, 30000, "Planet Velocity (m/s)")
         ]
 
+        self.active_slider = None  # Slider currently being dragged
         self.selected_body = None
+        self.selected_speed = 0.0  # Speed of the selected body, refreshed once per step
+        self.info_lines = {}  # Selected-body info line -> (text, rendered surface)
+
+        # Screen areas drawn last frame; only these are cleared and redrawn
+        self._last_rects = []
+        self._full_redraw = True
+
+        # Trails are drawn once into a persistent surface that fades a little
+        # every step, rather than redrawn point by point each frame
+        self.trail_surf = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA).convert_alpha()
+        self.clear_trails()
+
+        # Static text is rendered once and blitted every frame
+        instructions = [
+            "SPACE: Pause/Resume",
+            "R: Reset Simulation", 
+            "C: Clear Trails",
+            "Click: Select Body",
+            "Drag Sliders: Adjust Parameters"
+        ]
+        self.instruction_surfaces = [render_text(self.small_font, line, WHITE) for line in instructions]
+        self.status_surfaces = {
+            False: render_text(self.font, "Status: RUNNING", GREEN),
+            True: render_text(self.font, "Status: PAUSED", RED)
+        }
+
+    def clear_state(self):
+        """Reset the position/velocity/mass arrays to an empty system"""
+        self.pos = np.zeros((0, 2), dtype=FLOAT)
+        self.vel = np.zeros((0, 2), dtype=FLOAT)
+        self.mass = np.zeros(0, dtype=FLOAT)
+        self.is_sun = np.zeros(0, dtype=bool)
+        self.hit_radii = np.zeros(0)  # Click radius of each body, in pixels
+        self.gm = None  # G * mass, recomputed after any mass change
+        self.acc = None  # Accelerations at the current positions, once computed
+        self.sun_idx = None
+        self.movable_idx = np.zeros(0, dtype=np.intp)  # Bodies the integrator moves
+        self._d = np.empty((0, 0, 2), dtype=FLOAT)
+        self._acc = np.empty((0, 2), dtype=FLOAT)
+
+    def _alloc_scratch(self):
+        """(Re)allocate the pairwise work buffers to match the body count"""
+        m, n = len(self.movable_idx), len(self.mass)
+        b = min(m, DIRECT_BLOCK)  # The pairwise buffers only hold one tile of rows
+        self._d = np.empty((b, n, 2), dtype=FLOAT)
+        self._r2 = np.empty((b, n), dtype=FLOAT)
+        self._inv_r = np.empty((b, n), dtype=FLOAT)
+        self._acc = np.empty((m, 2), dtype=FLOAT)
+
+    def add_body(self, x, y, radius, color, mass, name="Body"):
+        """Append a body to the state arrays and return its view"""
+        self.pos = np.vstack([self.pos, np.array([(x, y)], dtype=FLOAT)])
+        self.vel = np.vstack([self.vel, np.zeros((1, 2), dtype=FLOAT)])
+        self.mass = np.append(self.mass, FLOAT(mass))
+        self.is_sun = np.append(self.is_sun, False)
+        self.hit_radii = np.append(self.hit_radii, max(radius, 10))
+        self.gm = None
+        self.update_movable()
+
+        body = Body(self, len(self.bodies), radius, color, name)
+        self.bodies.append(body)
+        return body
+
+    def update_movable(self):
+        """Refresh the indices of the bodies the integrator moves"""
+        # Only these rows are ever integrated, so the sun needs no per-step check
+        self.movable_idx = np.flatnonzero(~self.is_sun)
+        self.acc = None
 
     def setup_solar_system(self):
         """Create initial solar system setup"""
         # Sun
-        sun = Body(0, 0, 30, YELLOW, 1.989e30, "Sun")
+        sun = self.add_body(0, 0, 30, YELLOW, 1.989e30, "Sun")
         sun.is_sun = True
         sun.vy = 2000
-        self.bodies.append(sun)
+        self.sun_idx = sun.idx
 
         # Earth
-        earth = Body(-1.496e11, 0, 8, BLUE, 5.972e24, "Earth")
+        earth = self.add_body(-1.496e11, 0, 8, BLUE, 5.972e24, "Earth")
         earth.vy = 29780  # orbital velocity
-        self.bodies.append(earth)
 
         # Mars
-        mars = Body(-2.279e11, 0, 6, RED, 6.39e23, "Mars")
+        mars = self.add_body(-2.279e11, 0, 6, RED, 6.39e23, "Mars")
         mars.vy = 24070
-        self.bodies.append(mars)
 
         # Venus
-        venus = Body(-1.082e11, 0, 7, ORANGE, 4.867e24, "Venus")
+        venus = self.add_body(-1.082e11, 0, 7, ORANGE, 4.867e24, "Venus")
         venus.vy = 35020
-        self.bodies.append(venus)
 
     def handle_events(self):
         """Handle user input events"""
+        # Only the last mouse motion before each button event (or the end of the
+        # queue) matters, and only the slider being dragged needs to see it
+        motion = None
         for event in pygame.event.get():
+            if event.type == pygame.MOUSEMOTION:
+                motion = event
+                continue
+            if motion is not None:
+                self.drag_active_slider(motion)
+                motion = None
+
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                # The window was uncovered; areas outside the dirty rects are stale
+                self._full_redraw = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.paused = not self.paused
@@ -207,20 +423,28 @@ class OrbitSimulation:
                 if event.button == 1:  # Left click
                     self.handle_mouse_click(event.pos)
 
-            # Handle slider events
-            for slider in self.sliders:
-                slider.handle_event(event)
+            # Handle slider button events
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                for slider in self.sliders:
+                    slider.handle_event(event)
+                self.active_slider = next((slider for slider in self.sliders if slider.dragging), None)
+
+        if motion is not None:
+            self.drag_active_slider(motion)
+
+    def drag_active_slider(self, event):
+        """Pass a mouse motion event to the slider being dragged, if any"""
+        if self.active_slider is not None:
+            self.active_slider.handle_event(event)
 
     def handle_mouse_click(self, pos):
         """Handle mouse clicks on bodies"""
-        for body in self.bodies:
-            screen_x = int(body.x * SCALE + WIDTH // 2)
-            screen_y = int(body.y * SCALE + HEIGHT // 2)
-
-            distance = math.sqrt((pos[0] - screen_x)**2 + (pos[1] - screen_y)**2)
-            if distance <= max(body.radius, 10):
-                self.selected_body = body
-                break
+        # Compare squared distances to squared radii for every body at once
+        d2 = ((self._screen_xy - np.asarray(pos, dtype=np.int64)) ** 2).sum(axis=1)
+        hit = d2 <= self.hit_radii * self.hit_radii
+        if hit.any():
+            self.selected_body = self.bodies[int(np.argmin(np.where(hit, d2, np.inf)))]
+            self.selected_speed = math.hypot(self.selected_body.vx, self.selected_body.vy)
         else:
             self.selected_body = None
 
@@ -229,94 +453,209 @@ class OrbitSimulation:
         if self.paused:
             return
 
-        # Update parameters from sliders
-        global TIMESTEP, SCALE
-        TIMESTEP = self.sliders[0].val
+        # Update parameters from sliders, but only after one has moved
+        if any(slider.dirty for slider in self.sliders):
+            self.apply_sliders()
+
+        # Update body positions, and their screen positions once for this
+        # step's trails and every frame drawn until the next step
+        self._step(self.timestep)
+        self.update_screen_positions()
+
+        # The speed readout only changes when the bodies move
+        if self.selected_body:
+            speed = math.hypot(self.selected_body.vx, self.selected_body.vy)
+            if abs(speed - self.selected_speed) > 1:
+                self.selected_speed = speed
+
+        # Add to orbit trails
+        self.update_trails()
+
+    def apply_sliders(self):
+        """Copy the slider values into the simulation parameters"""
+        self.timestep = self.sliders[0].val
         sun_mass = self.sliders[1].val
-        SCALE = self.sliders[2].val
-        planet_velocity = self.sliders[3].val
+        if self.sliders[2].val != self.scale:
+            # Trails drawn at the old scale no longer line up with the bodies
+            self.scale = self.sliders[2].val
+            self.clear_trails()
 
         # Update sun mass
-        for body in self.bodies:
-            if body.is_sun:
-                body.mass = sun_mass
-                break
+        if self.sun_idx is not None and self.mass[self.sun_idx] != sun_mass:
+            self.bodies[self.sun_idx].mass = sun_mass
 
-        # Update body positions
-        for body in self.bodies:
-            body.update_position(self.bodies, TIMESTEP)
+        for slider in self.sliders:
+            slider.dirty = False
+
+    def _step(self, dt):
+        """Advance every body by one timestep using velocity Verlet (kick-drift-kick)"""
+        movable = self.movable_idx
+        if self.acc is None:
+            self.acc = self._accelerations()
+
+        # Half kick with the acceleration left over from the previous step,
+        # drift, then half kick with the acceleration at the new positions
+        # (the sun stays fixed; self.acc has one row per movable body)
+        self.vel[movable] += self.acc * (0.5 * dt)
+        self.pos[movable] += self.vel[movable] * dt
+        self.acc = self._accelerations()
+        self.vel[movable] += self.acc * (0.5 * dt)
+
+    def _accelerations(self):
+        if len(self.bodies) > BARNES_HUT_THRESHOLD:
+            return self._tree_accelerations()
+        return self._direct_accelerations()
+
+    def _tree_accelerations(self):
+        """O(N log N) accelerations from a Barnes-Hut quadtree rebuilt every step"""
+        root = QuadTree.build(self.pos, self.mass)
+        xy = self.pos.tolist()
+        acc = np.empty((len(self.movable_idx), 2), dtype=FLOAT)
+        for k, i in enumerate(self.movable_idx.tolist()):
+            acc[k] = root.acceleration(i, xy[i][0], xy[i][1], THETA)
+        return acc
+
+    def _direct_accelerations(self):
+        """Exact accelerations from vectorized pairwise gravity"""
+        m = len(self.movable_idx)
+        if self._acc.shape[0] != m or self._d.shape[1] != len(self.bodies):
+            self._alloc_scratch()
+
+        # G is folded into the masses once, not multiplied in every step
+        if self.gm is None:
+            self.gm = G * self.mass
+
+        # All intermediates are written into preallocated buffers, so a step
+        # allocates nothing of size N*N. Rows are processed DIRECT_BLOCK at a
+        # time so each tile's buffers stay in cache across the kernel's passes
+        for start in range(0, m, DIRECT_BLOCK):
+            stop = min(start + DIRECT_BLOCK, m)
+            b = stop - start
+            pairwise_accelerations(self.pos, self.gm, self.movable_idx[start:stop],
+                                   self._d[:b], self._r2[:b], self._inv_r[:b], self._acc[start:stop])
+        return self._acc
+
+    def update_screen_positions(self):
+        """Convert every body position to screen coordinates in one pass"""
+        # Clipped so bodies far off screen cannot wrap around when cast to int
+        screen_xy = np.clip(self.pos * self.scale + np.array([WIDTH // 2, HEIGHT // 2]), -SCREEN_LIMIT, SCREEN_LIMIT)
+        self._screen_xy = screen_xy.astype(np.int32)
 
     def draw(self):
-        """Draw everything on screen"""
-        self.screen.fill(BLACK)
+        """Draw everything on screen, updating only the areas that changed"""
+        if self._full_redraw:
+            self.screen.fill(BLACK)
+        else:
+            # Erase what was drawn last frame
+            for rect in self._last_rects:
+                self.screen.fill(BLACK, rect)
+        rects = []
+
+        # Draw orbit trails
+        if self.trail_rect is not None:
+            rects.append(self.screen.blit(self.trail_surf, self.trail_rect, self.trail_rect))
 
         # Draw bodies
         for body in self.bodies:
-            body.draw(self.screen, self.small_font)
+            screen_x, screen_y = self._screen_xy[body.idx].tolist()
+            rects.extend(body.draw(self.screen, self.small_font, screen_x, screen_y))
 
         # Highlight selected body
         if self.selected_body:
-            screen_x = int(self.selected_body.x * SCALE + WIDTH // 2)
-            screen_y = int(self.selected_body.y * SCALE + HEIGHT // 2)
-            pygame.draw.circle(self.screen, WHITE, (screen_x, screen_y), 
-                             max(self.selected_body.radius, 10) + 5, 2)
+            screen_x, screen_y = self._screen_xy[self.selected_body.idx].tolist()
+            r = max(self.selected_body.radius, 10) + 5
+            rects.append(self.screen.blit(circle_sprite(r, WHITE, 2), (screen_x - r, screen_y - r)))
 
         # Draw UI
-        self.draw_ui()
+        rects.extend(self.draw_ui())
 
-        pygame.display.flip()
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            pygame.display.update(self._last_rects + rects)
+        self._last_rects = rects
 
     def draw_ui(self):
-        """Draw user interface elements"""
+        """Draw user interface elements and return the screen rects touched"""
         # Draw sliders
-        for slider in self.sliders:
-            slider.draw(self.screen, self.small_font)
+        rects = [slider.draw(self.screen, self.small_font) for slider in self.sliders]
 
         # Draw instructions
-        instructions = [
-            "SPACE: Pause/Resume",
-            "R: Reset Simulation", 
-            "C: Clear Trails",
-            "Click: Select Body",
-            "Drag Sliders: Adjust Parameters"
-        ]
-
         y_offset = HEIGHT - 120
-        for instruction in instructions:
-            text = self.small_font.render(instruction, True, WHITE)
-            self.screen.blit(text, (WIDTH - 250, y_offset))
+        for text in self.instruction_surfaces:
+            rects.append(self.screen.blit(text, (WIDTH - 250, y_offset)))
             y_offset += 20
 
         # Draw status
-        status = "PAUSED" if self.paused else "RUNNING"
-        status_text = self.font.render(f"Status: {status}", True, GREEN if not self.paused else RED)
-        self.screen.blit(status_text, (10, 10))
+        rects.append(self.screen.blit(self.status_surfaces[self.paused], (10, 10)))
 
         # Draw selected body info
         if self.selected_body:
             info = [
                 f"Selected: {self.selected_body.name}",
                 f"Mass: {self.selected_body.mass:.2e} kg",
-                f"Velocity: {math.sqrt(self.selected_body.vx**2 + self.selected_body.vy**2):.0f} m/s",
+                f"Velocity: {self.selected_speed:.0f} m/s",
                 f"Position: ({self.selected_body.x:.2e}, {self.selected_body.y:.2e}) m"
             ]
 
+            # Each line is re-rendered only when its text changes
             y_offset = 250
-            for info_line in info:
-                text = self.small_font.render(info_line, True, WHITE)
-                self.screen.blit(text, (10, y_offset))
+            for i, info_line in enumerate(info):
+                cached = self.info_lines.get(i)
+                if cached is None or cached[0] != info_line:
+                    cached = self.info_lines[i] = (info_line, render_text(self.small_font, info_line, WHITE))
+                rects.append(self.screen.blit(cached[1], (10, y_offset)))
                 y_offset += 20
 
+        return rects
+
     def reset_simulation(self):
         """Reset simulation to initial state"""
         self.bodies.clear()
+        self.clear_state()
         self.setup_solar_system()
+        self.update_screen_positions()
+        self.clear_trails()
         self.selected_body = None
 
+        # Re-apply the current slider values (e.g. sun mass) to the fresh bodies
+        for slider in self.sliders:
+            slider.dirty = True
+
+    def update_trails(self):
+        """Fade the trail surface and extend each trail by its latest segment"""
+        prev_xy, self._trail_xy = self._trail_xy, self._screen_xy
+        if prev_xy is None or len(prev_xy) != len(self._trail_xy):
+            return
+
+        if self.trail_rect is not None:
+            self.trail_surf.fill((0, 0, 0, TRAIL_FADE), self.trail_rect, special_flags=pygame.BLEND_RGBA_SUB)
+
+        step_rect = None
+        bounds = self.trail_surf.get_rect()
+        for i in self.movable_idx.tolist():
+            start, end = prev_xy[i].tolist(), self._trail_xy[i].tolist()
+            if start != end:
+                # A segment drawn entirely off screen comes back as an empty
+                # rect at its start point; uniting that would stretch the
+                # trail area across the whole screen
+                rect = pygame.draw.line(self.trail_surf, self.bodies[i].color, start, end, 2).clip(bounds)
+                if rect.width and rect.height:
+                    step_rect = rect if step_rect is None else step_rect.union(rect)
+
+        # Segments fade out completely after TRAIL_FADE_STEPS steps, so the
+        # trail area is the union of the areas drawn over that window
+        self.trail_rects.append(step_rect)
+        rects = [rect for rect in self.trail_rects if rect is not None]
+        self.trail_rect = rects[0].unionall(rects[1:]) if rects else None
+
     def clear_trails(self):
         """Clear orbit trails"""
-        for body in self.bodies:
-            body.orbit_trail.clear()
+        self.trail_surf.fill((0, 0, 0, 0))
+        self.trail_rects = deque(maxlen=TRAIL_FADE_STEPS)
+        self.trail_rect = None  # Area of trail_surf that may hold visible pixels
+        self._trail_xy = None  # Screen positions the trails were last extended to
 
     def run(self):
         """Main simulation loop"""
@@ -15,8 +15,11 @@ Controls remain the same:
 """
 
 import pygame
+import numpy as np
 import math
 import random
+import functools
+from collections import defaultdict, deque
 
 # Initialize Pygame
 pygame.init()
@@ -27,7 +30,17 @@ G = 0.8
 PLANET_RADIUS = 12
 SUN_RADIUS = 20
 MIN_DIST = 10
+PHYSICS_DT = 0.5  # Simulation time advanced by one physics step
+PHYSICS_RATE = 60  # Physics steps per real second, independent of the frame rate
+MAX_SUBSTEPS = 5  # Most physics steps run in one frame before falling behind
+FPS = 60
+IDLE_FPS = 15  # Frame rate while nothing is moving and there is no input
 GRID_SIZE = 50
+SPATIAL_CELL = 50  # Minimum cell size of the hit-test grid, in world units
+BARNES_HUT_THRESHOLD = 5000  # Use the quadtree above this many bodies
+THETA = 0.5  # Barnes-Hut opening angle (smaller is more accurate)
+TRAIL_LENGTH = 200  # Number of trail points kept per body
+TRAIL_BANDS = 8  # Trails fade from old to new in this many brightness steps
 
 # Zoom and camera constants
 MIN_ZOOM = 0.1
@@ -57,6 +70,15 @@ small_font = pygame.font.Font(None, 18)
 large_font = pygame.font.Font(None, 32)
 input_font = pygame.font.Font(None, 24)
 
+# Text surfaces are cached, since most labels are the same from frame to frame
+@functools.lru_cache(maxsize=512)
+def render_small(text, color):
+    return small_font.render(text, True, color)
+
+@functools.lru_cache(maxsize=32)
+def render_large(text, color):
+    return large_font.render(text, True, color)
+
 class Camera:
     """Camera system for zoom and pan"""
     def __init__(self):
@@ -118,6 +140,7 @@ class InputBox:
         self.color = self.color_inactive
         self.text = str(default_text)
         self.label = label
+        self.label_surface = render_small(label, WHITE)  # Labels never change
         self.txt_surface = input_font.render(self.text, True, WHITE)
         self.active = False
         self.number_only = number_only
@@ -157,8 +180,7 @@ class InputBox:
         return None
 
     def draw(self, screen):
-        label_surface = small_font.render(self.label, True, WHITE)
-        screen.blit(label_surface, (self.rect.x, self.rect.y - 20))
+        screen.blit(self.label_surface, (self.rect.x, self.rect.y - 20))
 
         pygame.draw.rect(screen, BLACK, self.rect)
         pygame.draw.rect(screen, self.color, self.rect, 2)
@@ -183,53 +205,117 @@ class InputBox:
         self.text = str(value)
         self.txt_surface = input_font.render(self.text, True, WHITE)
 
+def true_runs(mask):
+    """Return [start, stop) index pairs of the runs of True in a boolean array"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    return np.flatnonzero(np.diff(padded)).reshape(-1, 2).tolist()
+
+class BodyStore:
+    """Structure-of-arrays storage for the physical state of every body"""
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.pos = np.empty((capacity, 2))
+        self.vel = np.empty((capacity, 2))
+        self.mass = np.empty(capacity)
+        self.acc = np.empty((capacity, 2))  # Accelerations at the current positions
+        self.acc_valid = False  # Cleared whenever a body or mass changes
+        self.pair_gm = None  # G * mass pair constants, rebuilt with acc
+        self.held = np.empty(capacity, dtype=bool)  # Selected bodies are held in place
+
+    def add(self, x, y, mass, vx, vy):
+        """Append a body's state and return its row index"""
+        if self.count == len(self.mass):
+            self.grow()
+        idx = self.count
+        self.pos[idx] = (x, y)
+        self.vel[idx] = (vx, vy)
+        self.mass[idx] = mass
+        self.held[idx] = False
+        self.count += 1
+        self.acc_valid = False
+        return idx
+
+    def grow(self):
+        """Double the capacity of every array, keeping the existing rows"""
+        capacity = 2 * len(self.mass)
+        for name in ('pos', 'vel', 'mass', 'acc', 'held'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def clear(self):
+        """Remove every body"""
+        self.count = 0
+
 class Body:
-    """Celestial body with scaled physics properties"""
-    def __init__(self, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
-        self.x = float(x)
-        self.y = float(y)
-        self.mass = float(mass)
-        self.vx = float(vx)
-        self.vy = float(vy)
+    """Celestial body with scaled physics properties; its state lives in a BodyStore row"""
+    _glow_cache = {}  # (draw_radius, color) -> list of (glow surface, glow radius)
+
+    def __init__(self, store, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
+        self.store = store
+        self.idx = store.add(x, y, mass, vx, vy)
         self.radius = radius
         self.color = color
         self.name = name
 
-        self.trail = []
-        self.selected = False
+        self.trail = deque(maxlen=TRAIL_LENGTH)
         self.is_sun = False
 
-        self.fx = 0.0
-        self.fy = 0.0
+        # Trail colour of each brightness band, from oldest to newest, at half intensity
+        trail_color = tuple(c // 2 for c in color)
+        self.trail_colors = [tuple(int(c * (band + 1) / TRAIL_BANDS) for c in trail_color)
+                             for band in range(TRAIL_BANDS)]
+
+    # Physical state is read and written through the store's arrays
+    @property
+    def x(self):
+        return self.store.pos[self.idx, 0]
+
+    @x.setter
+    def x(self, value):
+        self.store.pos[self.idx, 0] = value
 
-    def calculate_force_from(self, other):
-        """Calculate gravitational force from another body"""
-        dx = other.x - self.x
-        dy = other.y - self.y
+    @property
+    def y(self):
+        return self.store.pos[self.idx, 1]
 
-        distance_squared = dx * dx + dy * dy
-        distance = max(MIN_DIST, math.sqrt(distance_squared))
+    @y.setter
+    def y(self, value):
+        self.store.pos[self.idx, 1] = value
 
-        force_magnitude = G * self.mass * other.mass / (distance * distance)
+    @property
+    def vx(self):
+        return self.store.vel[self.idx, 0]
 
-        fx = force_magnitude * dx / distance
-        fy = force_magnitude * dy / distance
+    @vx.setter
+    def vx(self, value):
+        self.store.vel[self.idx, 0] = value
 
-        return fx, fy
+    @property
+    def vy(self):
+        return self.store.vel[self.idx, 1]
 
-    def apply_force(self, fx, fy, dt):
-        """Apply force to update velocity and position"""
-        if not self.selected:
-            ax = fx / self.mass
-            ay = fy / self.mass
+    @vy.setter
+    def vy(self, value):
+        self.store.vel[self.idx, 1] = value
 
-            self.vx += ax * dt
-            self.vy += ay * dt
+    @property
+    def mass(self):
+        return self.store.mass[self.idx]
 
-            self.x += self.vx * dt
-            self.y += self.vy * dt
+    @mass.setter
+    def mass(self, value):
+        self.store.mass[self.idx] = value
+        self.store.acc_valid = False
 
-            self.update_trail()
+    @property
+    def selected(self):
+        return self.store.held[self.idx]
+
+    @selected.setter
+    def selected(self, value):
+        self.store.held[self.idx] = value
 
     def update_trail(self):
         """Update orbit trail"""
@@ -237,32 +323,58 @@ class Body:
         if not self.trail or abs(self.trail[-1][0] - self.x) > 2 or abs(self.trail[-1][1] - self.y) > 2:
             self.trail.append(current_pos)
 
-        if len(self.trail) > 200:
-            self.trail.pop(0)
-
     def get_velocity_magnitude(self):
         """Get current velocity magnitude"""
-        return math.sqrt(self.vx**2 + self.vy**2)
+        return math.hypot(self.vx, self.vy)
 
     def get_velocity_angle(self):
         """Get current velocity angle in degrees"""
         return math.degrees(math.atan2(self.vy, self.vx))
 
+    def get_glow(self, draw_radius):
+        """Return the sun's glow layers for this radius, rendering them on first use"""
+        key = (draw_radius, self.color)
+        glow = Body._glow_cache.get(key)
+        if glow is None:
+            glow = []
+            for i in range(3):
+                glow_radius = draw_radius + i * 4
+                glow_alpha = 100 - i * 30
+                glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2)).convert()
+                glow_surface.set_alpha(glow_alpha)
+                pygame.draw.circle(glow_surface, self.color, 
+                                 (glow_radius, glow_radius), glow_radius)
+                glow.append((glow_surface, glow_radius))
+            Body._glow_cache[key] = glow
+        return glow
+
     def draw(self, screen, camera):
         """Draw the body and its trail with camera transformation"""
         # Draw trail
         if len(self.trail) > 2:
-            trail_color = tuple(c // 2 for c in self.color)
-            screen_trail = []
-            for world_pos in self.trail:
-                screen_pos = camera.world_to_screen(world_pos[0], world_pos[1])
-                screen_trail.append(screen_pos)
-
-            if len(screen_trail) > 1:
-                for i in range(1, len(screen_trail)):
-                    alpha = i / len(screen_trail)
-                    color = tuple(int(c * alpha) for c in trail_color)
-                    pygame.draw.line(screen, color, screen_trail[i-1], screen_trail[i], 2)
+            # Transform the whole trail to screen coordinates at once
+            world_trail = np.array(self.trail)
+            screen_trail = ((world_trail + (camera.pan_x, camera.pan_y)) * camera.zoom
+                            + (WIDTH // 2, HEIGHT // 2))
+
+            # Cull segments whose bounding box misses the screen; a segment
+            # can cross the screen with both ends off it, so test the box
+            lo = np.minimum(screen_trail[:-1], screen_trail[1:])
+            hi = np.maximum(screen_trail[:-1], screen_trail[1:])
+            visible = ((lo < (WIDTH + 2, HEIGHT + 2)) & (hi > -2)).all(axis=1)
+
+            if visible.any():
+                screen_trail = screen_trail.astype(np.int32)
+
+                # Older points are darker; each visible run within a
+                # brightness band is one polyline
+                segments = len(visible)
+                for band, color in enumerate(self.trail_colors):
+                    start = band * segments // TRAIL_BANDS
+                    stop = (band + 1) * segments // TRAIL_BANDS
+                    for run_start, run_stop in true_runs(visible[start:stop]):
+                        points = screen_trail[start + run_start:start + run_stop + 1]
+                        pygame.draw.lines(screen, color, False, points.tolist(), 2)
 
         # Get screen position
         screen_x, screen_y = camera.world_to_screen(self.x, self.y)
@@ -275,13 +387,7 @@ class Body:
             draw_radius = max(3, int(self.radius * camera.zoom))
 
             if self.is_sun:
-                for i in range(3):
-                    glow_radius = draw_radius + i * 4
-                    glow_alpha = 100 - i * 30
-                    glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2))
-                    glow_surface.set_alpha(glow_alpha)
-                    pygame.draw.circle(glow_surface, self.color, 
-                                     (glow_radius, glow_radius), glow_radius)
+                for glow_surface, glow_radius in self.get_glow(draw_radius):
                     screen.blit(glow_surface, 
                               (screen_x - glow_radius, screen_y - glow_radius))
 
@@ -293,38 +399,218 @@ class Body:
 
             # Draw name and coordinates
             if camera.zoom > 0.5:
-                name_surface = small_font.render(self.name, True, WHITE)
+                name_surface = render_small(self.name, WHITE)
                 screen.blit(name_surface, (screen_x + draw_radius + 5, screen_y - 10))
 
                 coord_text = f"({int(self.x)}, {int(-self.y)})"
-                coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
+                coord_surface = render_small(coord_text, LIGHT_GRAY)
                 screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5))
 
-def apply_mutual_gravity(bodies, dt):
+_pair_indices = {}
+
+def pair_indices(n):
+    """Return the (i, j) index arrays of every unordered pair i < j, cached per body count"""
+    pairs = _pair_indices.get(n)
+    if pairs is None:
+        pairs = _pair_indices[n] = np.triu_indices(n, 1)
+    return pairs
+
+class QuadTree:
+    """Barnes-Hut quadtree node holding the total mass and center of mass of its bodies"""
+    MAX_DEPTH = 32  # Coincident bodies are merged instead of split forever
+
+    def __init__(self, cx, cy, half):
+        self.cx = cx
+        self.cy = cy
+        self.half = half
+        self.mass = 0.0
+        self.com_x = 0.0
+        self.com_y = 0.0
+        self.indices = []  # Bodies held by a leaf (more than one only at MAX_DEPTH)
+        self.children = None
+
+    @classmethod
+    def build(cls, xs, ys, masses):
+        """Build a tree covering every body"""
+        min_x, max_x = xs.min(), xs.max()
+        min_y, max_y = ys.min(), ys.max()
+        half = max(max_x - min_x, max_y - min_y) / 2 or 1.0
+        root = cls((min_x + max_x) / 2, (min_y + max_y) / 2, half)
+        for i, (x, y, m) in enumerate(zip(xs.tolist(), ys.tolist(), masses.tolist())):
+            root.insert(i, x, y, m)
+        return root
+
+    def insert(self, i, x, y, m, depth=0):
+        if self.children is not None:
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        elif self.indices and depth < self.MAX_DEPTH:
+            # Occupied leaf: split and push the existing body down
+            self.children = [QuadTree(self.cx + dx * self.half / 2, self.cy + dy * self.half / 2, self.half / 2)
+                             for dy in (-1, 1) for dx in (-1, 1)]
+            self._child_for(self.com_x, self.com_y).insert(self.indices.pop(), self.com_x, self.com_y, self.mass, depth + 1)
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        else:
+            # Empty leaf, or coincident bodies at the depth limit
+            self.indices.append(i)
+
+        # Update total mass and center of mass
+        total = self.mass + m
+        self.com_x = (self.com_x * self.mass + x * m) / total
+        self.com_y = (self.com_y * self.mass + y * m) / total
+        self.mass = total
+
+    def _child_for(self, x, y):
+        return self.children[(2 if y >= self.cy else 0) + (1 if x >= self.cx else 0)]
+
+    def acceleration(self, i, x, y, theta):
+        """Gravitational acceleration on body i at (x, y)"""
+        ax = ay = 0.0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.mass == 0 or i in node.indices:
+                continue
+            dx = node.com_x - x
+            dy = node.com_y - y
+            distance_squared = dx * dx + dy * dy
+            # Far enough away (width / distance < theta): treat the node as one body
+            if node.children is None or 4 * node.half * node.half < theta * theta * distance_squared:
+                inv_d = 1.0 / math.sqrt(max(MIN_DIST * MIN_DIST, distance_squared))
+                f = node.mass * inv_d * inv_d * inv_d
+                ax += f * dx
+                ay += f * dy
+            else:
+                stack.extend(node.children)
+        return G * ax, G * ay
+
+def tree_accelerations(xs, ys, masses):
+    """O(N log N) accelerations from a Barnes-Hut quadtree rebuilt every step"""
+    root = QuadTree.build(xs, ys, masses)
+    ax = np.empty(len(xs))
+    ay = np.empty(len(xs))
+    for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        ax[i], ay[i] = root.acceleration(i, x, y, THETA)
+    return ax, ay
+
+_pair_buffers = {}
+
+def pair_buffers(n):
+    """Return four scratch arrays with one slot per pair, cached per body count"""
+    buffers = _pair_buffers.get(n)
+    if buffers is None:
+        pairs = n * (n - 1) // 2
+        buffers = _pair_buffers[n] = tuple(np.empty(pairs) for _ in range(4))
+    return buffers
+
+def pair_gravity_constants(masses):
+    """Return G * m_j and G * m_i for every pair i < j"""
+    i, j = pair_indices(len(masses))
+    return G * masses[j], G * masses[i]
+
+def gravity_accelerations(xs, ys, masses, pair_gm=None):
+    """Return the gravitational accelerations (ax, ay) of bodies given as plain arrays.
+
+    pair_gm is the result of pair_gravity_constants(masses), if the caller
+    keeps it between steps.
+    """
+    if len(xs) > BARNES_HUT_THRESHOLD:
+        return tree_accelerations(xs, ys, masses)
+
+    # Every step below writes into preallocated per-pair buffers, so the
+    # kernel allocates no pair-sized temporaries
+    n = len(xs)
+    i, j = pair_indices(n)
+    dx, dy, d2, tmp = pair_buffers(n)
+
+    # Each unordered pair is evaluated once; dx points from body i to body j
+    np.take(xs, j, out=dx)
+    dx -= np.take(xs, i, out=tmp)
+    np.take(ys, j, out=dy)
+    dy -= np.take(ys, i, out=tmp)
+
+    # Distances are clamped to MIN_DIST
+    np.multiply(dx, dx, out=d2)
+    d2 += np.multiply(dy, dy, out=tmp)
+    np.maximum(d2, MIN_DIST * MIN_DIST, out=d2)
+
+    # 1/d^3 from one reciprocal square root and two multiplies instead of a pow
+    inv_d = np.reciprocal(np.sqrt(d2, out=d2), out=d2)
+    inv_d3 = np.multiply(inv_d, inv_d, out=tmp)
+    inv_d3 *= inv_d
+    dx *= inv_d3
+    dy *= inv_d3
+
+    # Newton's third law: the pair pulls i toward j and j toward i
+    if pair_gm is None:
+        pair_gm = pair_gravity_constants(masses)
+    gm_j, gm_i = pair_gm
+    weights = tmp
+    ax = np.bincount(i, np.multiply(dx, gm_j, out=weights), n)
+    ax -= np.bincount(j, np.multiply(dx, gm_i, out=weights), n)
+    ay = np.bincount(i, np.multiply(dy, gm_j, out=weights), n)
+    ay -= np.bincount(j, np.multiply(dy, gm_i, out=weights), n)
+    return ax, ay
+
+def gravity_step(pos, vel, masses, acc, moving, dt, pair_gm=None):
+    """Advance the moving rows of pos and vel in place by one velocity Verlet step.
+
+    acc must hold the accelerations at the current positions on entry and is
+    updated to the accelerations at the new positions.
+    """
+    # Half kick, drift, then half kick with the acceleration at the new positions
+    vel[moving] += acc[moving] * (0.5 * dt)
+    pos[moving] += vel[moving] * dt
+    acc[:, 0], acc[:, 1] = gravity_accelerations(pos[:, 0], pos[:, 1], masses, pair_gm)
+    vel[moving] += acc[moving] * (0.5 * dt)
+
+def apply_mutual_gravity(store, bodies, dt):
     """Apply mutual gravitational forces between all bodies"""
-    for body in bodies:
-        body.fx = 0.0
-        body.fy = 0.0
-
-    for i, body1 in enumerate(bodies):
-        for j, body2 in enumerate(bodies):
-            if i != j:
-                fx, fy = body1.calculate_force_from(body2)
-                body1.fx += fx
-                body1.fy += fy
-
-    for body in bodies:
-        body.apply_force(body.fx, body.fy, dt)
+    n = store.count
+    if n == 0:
+        return
 
-def get_body_at_position(screen_x, screen_y, bodies, camera):
+    # The accelerations and pair constants carry over between steps unless
+    # a body or mass changed
+    if not store.acc_valid:
+        store.pair_gm = None if n > BARNES_HUT_THRESHOLD else pair_gravity_constants(store.mass[:n])
+        store.acc[:n, 0], store.acc[:n, 1] = gravity_accelerations(store.pos[:n, 0], store.pos[:n, 1],
+                                                                   store.mass[:n], store.pair_gm)
+        store.acc_valid = True
+
+    # Selected bodies are held in place
+    moving = ~store.held[:n]
+    gravity_step(store.pos[:n], store.vel[:n], store.mass[:n], store.acc[:n], moving, dt, store.pair_gm)
+
+    for i in np.flatnonzero(moving).tolist():
+        bodies[i].update_trail()
+
+def build_spatial_hash(bodies):
+    """Bucket body indices by grid cell; cells are at least as wide as the largest body"""
+    cell_size = max([SPATIAL_CELL] + [body.radius for body in bodies])
+    cells = defaultdict(list)
+    for i, body in enumerate(bodies):
+        cells[(int(body.x // cell_size), int(body.y // cell_size))].append(i)
+    return cells, cell_size
+
+def get_body_at_position(screen_x, screen_y, bodies, camera, spatial_hash):
     """Find body at given screen position"""
     world_x, world_y = camera.screen_to_world(screen_x, screen_y)
 
-    for body in bodies:
-        distance = math.sqrt((body.x - world_x)**2 + (body.y - world_y)**2)
-        if distance <= body.radius:
-            return body
-    return None
+    # A body can only overlap the point if it sits in the same or a neighbouring cell
+    cells, cell_size = spatial_hash
+    cell_x, cell_y = int(world_x // cell_size), int(world_y // cell_size)
+    hits = []
+    for nx in (cell_x - 1, cell_x, cell_x + 1):
+        for ny in (cell_y - 1, cell_y, cell_y + 1):
+            for i in cells.get((nx, ny), ()):
+                body = bodies[i]
+                dx = body.x - world_x
+                dy = body.y - world_y
+                if dx * dx + dy * dy <= body.radius * body.radius:
+                    hits.append(i)
+
+    # Same answer as a scan in body order: the first body that is hit
+    return bodies[min(hits)] if hits else None
 
 def draw_cartesian_plane(screen, camera, show_grid=True):
     """Draw cartesian coordinate system with camera transformation"""
@@ -339,21 +625,21 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
     offset_x = (camera.pan_x * camera.zoom) % grid_spacing
     offset_y = (camera.pan_y * camera.zoom) % grid_spacing
 
+    # Line positions and their axis/grid classification, computed for all lines at once
+    xs = np.arange(offset_x, WIDTH, grid_spacing)
+    ys = np.arange(offset_y, HEIGHT, grid_spacing)
+    x_is_axis = np.abs((xs - WIDTH // 2) / camera.zoom - camera.pan_x) < 1
+    y_is_axis = np.abs((ys - HEIGHT // 2) / camera.zoom - camera.pan_y) < 1
+
     # Draw vertical grid lines
-    x = offset_x
-    while x < WIDTH:
-        world_x = (x - WIDTH // 2) / camera.zoom - camera.pan_x
-        color = AXIS_COLOR if abs(world_x) < 1 else GRID_COLOR
-        pygame.draw.line(screen, color, (int(x), 0), (int(x), HEIGHT), 1)
-        x += grid_spacing
+    for x, is_axis in zip(xs.astype(int).tolist(), x_is_axis.tolist()):
+        color = AXIS_COLOR if is_axis else GRID_COLOR
+        pygame.draw.line(screen, color, (x, 0), (x, HEIGHT), 1)
 
     # Draw horizontal grid lines
-    y = offset_y
-    while y < HEIGHT:
-        world_y = -((y - HEIGHT // 2) / camera.zoom - camera.pan_y)
-        color = AXIS_COLOR if abs(world_y) < 1 else GRID_COLOR
-        pygame.draw.line(screen, color, (0, int(y)), (WIDTH, int(y)), 1)
-        y += grid_spacing
+    for y, is_axis in zip(ys.astype(int).tolist(), y_is_axis.tolist()):
+        color = AXIS_COLOR if is_axis else GRID_COLOR
+        pygame.draw.line(screen, color, (0, y), (WIDTH, y), 1)
 
     # Draw main axes
     origin_screen_x, origin_screen_y = camera.world_to_screen(0, 0)
@@ -373,7 +659,7 @@ def draw_edit_interface(screen, body, input_boxes):
     pygame.draw.rect(screen, WHITE, box_rect, 2)
 
     title = "SUN" if body.is_sun else "PLANET"
-    title_surface = large_font.render(f"Editing {title}", True, WHITE)
+    title_surface = render_large(f"Editing {title}", WHITE)
     screen.blit(title_surface, (box_x + 10, box_y + 10))
 
     # Current velocity display
@@ -388,7 +674,7 @@ def draw_edit_interface(screen, body, input_boxes):
 
     y_offset = 50
     for info in current_info:
-        info_surface = small_font.render(info, True, LIGHT_GRAY)
+        info_surface = render_small(info, LIGHT_GRAY)
         screen.blit(info_surface, (box_x + 10, box_y + y_offset))
         y_offset += 18
 
@@ -401,7 +687,7 @@ def draw_edit_interface(screen, body, input_boxes):
 
     y_offset += 10
     for instruction in instructions:
-        inst_surface = small_font.render(instruction, True, LIGHT_GRAY)
+        inst_surface = render_small(instruction, LIGHT_GRAY)
         screen.blit(inst_surface, (box_x + 10, box_y + y_offset))
         y_offset += 18
 
@@ -419,7 +705,7 @@ def draw_planet_creation_dialog(screen, input_boxes):
     pygame.draw.rect(screen, DARK_GRAY, dialog_rect)
     pygame.draw.rect(screen, WHITE, dialog_rect, 3)
 
-    title_surface = large_font.render("Create New Planet", True, WHITE)
+    title_surface = render_large("Create New Planet", WHITE)
     screen.blit(title_surface, (dialog_x + 20, dialog_y + 20))
 
     # Instructions
@@ -431,7 +717,7 @@ def draw_planet_creation_dialog(screen, input_boxes):
 
     y_offset = 60
     for instruction in instructions:
-        inst_surface = small_font.render(instruction, True, LIGHT_GRAY)
+        inst_surface = render_small(instruction, LIGHT_GRAY)
         screen.blit(inst_surface, (dialog_x + 20, dialog_y + y_offset))
         y_offset += 20
 
@@ -448,6 +734,8 @@ class OrbitSimulation:
 
         self.running = True
         self.paused = False
+        self.physics_time = 0.0  # Real time not yet simulated, in seconds
+        self.had_input = False  # Whether the last handle_events saw any event
         self.edit_mode = False
         self.selected_body = None
         self.show_grid = True
@@ -455,20 +743,28 @@ class OrbitSimulation:
         # Camera system
         self.camera = Camera()
 
+        # Pre-rendered grid (including the black background), redrawn only
+        # when the camera moves
+        self.grid_surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.grid_key = None
+
         # Planet creation state
         self.creating_planet = False
         self.creation_input_boxes = []
         self.edit_input_boxes = []
 
+        self.store = BodyStore()
         self.bodies = []
+        self.spatial_hash = None  # Built on demand after bodies move or are added
         self.create_sun()
         self.setup_input_boxes()
 
     def create_sun(self):
         """Create the central sun at origin"""
-        sun = Body(0, 0, 600, 0, 0, SUN_RADIUS, YELLOW, "Sun")
+        sun = Body(self.store, 0, 0, 600, 0, 0, SUN_RADIUS, YELLOW, "Sun")
         sun.is_sun = True
         self.bodies.append(sun)
+        self.spatial_hash = None
 
     def setup_input_boxes(self):
         """Setup input boxes for planet creation and editing"""
@@ -574,9 +870,10 @@ class OrbitSimulation:
             colors = [BLUE, RED, GREEN, ORANGE, PURPLE, CYAN]
             color = random.choice(colors)
 
-            planet = Body(world_x, world_y, mass, vx, vy, 
+            planet = Body(self.store, world_x, world_y, mass, vx, vy, 
                          max(8, int(mass/50)), color, f"Planet-{len(self.bodies)}")
             self.bodies.append(planet)
+            self.spatial_hash = None
 
             for box in self.creation_input_boxes:
                 box.active = False
@@ -623,7 +920,9 @@ class OrbitSimulation:
 
     def handle_events(self):
         """Handle all pygame events"""
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        self.had_input = bool(events)
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
 
@@ -648,7 +947,7 @@ class OrbitSimulation:
 
                 elif event.button == 3:
                     mouse_x, mouse_y = event.pos
-                    clicked_body = get_body_at_position(mouse_x, mouse_y, self.bodies, self.camera)
+                    clicked_body = self.get_body_at(mouse_x, mouse_y)
 
                     if clicked_body:
                         # Start editing with enhanced velocity options
@@ -691,6 +990,7 @@ class OrbitSimulation:
 
                 elif event.key == pygame.K_r:
                     self.bodies.clear()
+                    self.store.clear()
                     self.create_sun()
                     self.camera = Camera()
                     self.edit_mode = False
@@ -700,17 +1000,33 @@ class OrbitSimulation:
                 elif event.key == pygame.K_g:
                     self.show_grid = not self.show_grid
 
-    def update_physics(self):
-        """Update simulation physics (only if not paused)"""
-        if not self.paused and not self.creating_planet and not self.edit_mode:
-            dt = 0.5
-            apply_mutual_gravity(self.bodies, dt)
+    def update_physics(self, frame_time):
+        """Update simulation physics (only if not paused) by fixed steps covering frame_time seconds"""
+        if self.paused or self.creating_planet or self.edit_mode:
+            self.physics_time = 0.0
+            return
+
+        # Run whole physics steps for the elapsed real time; after a long
+        # stall the backlog is dropped instead of being caught up
+        step_time = 1.0 / PHYSICS_RATE
+        self.physics_time = min(self.physics_time + frame_time, MAX_SUBSTEPS * step_time)
+        while self.physics_time >= step_time:
+            apply_mutual_gravity(self.store, self.bodies, PHYSICS_DT)
+            self.physics_time -= step_time
+            self.spatial_hash = None
+
+    def get_body_at(self, screen_x, screen_y):
+        """Find the body under a screen position using the spatial hash"""
+        if self.spatial_hash is None:
+            self.spatial_hash = build_spatial_hash(self.bodies)
+        return get_body_at_position(screen_x, screen_y, self.bodies, self.camera, self.spatial_hash)
 
     def draw(self):
         """Draw everything"""
-        self.screen.fill(BLACK)
-
-        draw_cartesian_plane(self.screen, self.camera, self.show_grid)
+        if self.show_grid:
+            self.draw_grid()
+        else:
+            self.screen.fill(BLACK)
 
         for body in self.bodies:
             body.draw(self.screen, self.camera)
@@ -726,7 +1042,7 @@ class OrbitSimulation:
 
         if not self.creating_planet and not self.edit_mode and not self.camera.dragging:
             mouse_x, mouse_y = pygame.mouse.get_pos()
-            hover_body = get_body_at_position(mouse_x, mouse_y, self.bodies, self.camera)
+            hover_body = self.get_body_at(mouse_x, mouse_y)
             if hover_body:
                 screen_x, screen_y = self.camera.world_to_screen(hover_body.x, hover_body.y)
                 radius = max(3, int(hover_body.radius * self.camera.zoom))
@@ -734,6 +1050,15 @@ class OrbitSimulation:
 
         pygame.display.flip()
 
+    def draw_grid(self):
+        """Draw the background grid from the cached surface"""
+        key = (self.camera.zoom, self.camera.pan_x, self.camera.pan_y)
+        if key != self.grid_key:
+            self.grid_surface.fill(BLACK)
+            draw_cartesian_plane(self.grid_surface, self.camera)
+            self.grid_key = key
+        self.screen.blit(self.grid_surface, (0, 0))
+
     def draw_instructions(self):
         """Draw control instructions"""
         instructions = [
@@ -745,7 +1070,7 @@ class OrbitSimulation:
 
         y_offset = 10
         for instruction in instructions:
-            text_surface = small_font.render(instruction, True, WHITE)
+            text_surface = render_small(instruction, WHITE)
             self.screen.blit(text_surface, (10, y_offset))
             y_offset += 20
 
@@ -764,17 +1089,22 @@ class OrbitSimulation:
         y_offset = HEIGHT - 100
         for i, line in enumerate(info_lines):
             color = status_color if i == 0 else WHITE
-            text_surface = small_font.render(line, True, color)
+            text_surface = render_small(line, color)
             self.screen.blit(text_surface, (WIDTH - 200, y_offset))
             y_offset += 20
 
+    def is_idle(self):
+        """True when the physics is stopped and the user is not interacting"""
+        stopped = self.paused or self.edit_mode or self.creating_planet
+        return stopped and not self.had_input and not self.camera.dragging
+
     def run(self):
         """Main simulation loop"""
         while self.running:
+            frame_time = self.clock.tick(IDLE_FPS if self.is_idle() else FPS) / 1000.0
             self.handle_events()
-            self.update_physics()
+            self.update_physics(frame_time)
             self.draw()
-            self.clock.tick(60)
 
         pygame.quit()
 
@@ -1,4 +1,5 @@
 import pygame
+import numpy as np
 import math
 import random
 
@@ -11,6 +12,12 @@ G = 0.8
 PLANET_RADIUS = 12
 SUN_RADIUS = 20
 MIN_DIST = 1
+BLOCK_SIZE = 64  # rows of the gravity kernel handled at once
+BARNES_HUT_THRESHOLD = 20000  # above this many bodies gravity uses the quadtree
+THETA = 0.7  # quadtree opening angle, smaller is more accurate but slower
+TRAIL_LENGTH = 200  # points kept per trail
+TRAIL_SPACING = 2  # a new trail point is added once a body has moved this far
+TRAIL_TIERS = 3  # trails fade from old to new in this many brightness steps
 BASE_GRID_SIZE = 50  # Base grid size in pixels
 
 # Zoom and camera constants
@@ -21,6 +28,8 @@ ZOOM_SPEED = 1.15
 #time scale
 MIN_TIME_SCALE=0.01
 MAX_TIME_SCALE=10000
+PHYSICS_DT = 0.5  # simulated time per frame at 1x
+MAX_SUBSTEPS = 64  # past this the substeps get longer instead of more numerous
 # Colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -63,6 +72,12 @@ class Camera:# What is this class for i wonder?... ps:its a camer make it move a
         screen_y = (world_y + self.pan_y) * self.zoom + HEIGHT // 2
         return int(screen_x), int(screen_y)
 
+    def world_to_screen_array(self, pos):
+        #world_to_screen for a whole (n, 2) array of positions at once
+        screen_x = (pos[:, 0] + self.pan_x) * self.zoom + WIDTH // 2
+        screen_y = (pos[:, 1] + self.pan_y) * self.zoom + HEIGHT // 2
+        return screen_x.astype(int), screen_y.astype(int)
+
     def screen_to_world(self, screen_x, screen_y):
         #Convert screen coords to ingame coords
         world_x = (screen_x - WIDTH // 2) / self.zoom - self.pan_x
@@ -106,10 +121,13 @@ class Camera:# What is this class for i wonder?... ps:its a camer make it move a
         self.dragging = False
     #for following a planet
     def update_follow(self):
+        #gives back True if the view moved
         if self.follow:
-            
+            moved = self.pan_x != -self.follow.x or self.pan_y != -self.follow.y
             self.pan_x = -self.follow.x 
             self.pan_y = -self.follow.y 
+            return moved
+        return False
     def stop_follow(self):
         self.follow = None
         
@@ -185,126 +203,218 @@ class InputBox:#make input box go brrrrrr
         self.text = str(value)
         self.txt_surface = input_font.render(self.text, True, WHITE)
 
+class BodyStore:
+    #all the physics numbers live here as arrays, one row per body, so gravity is done for every body at once
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.pos = np.empty((capacity, 2))
+        self.vel = np.empty((capacity, 2))
+        self.mass = np.empty(capacity)
+        self.radius = np.empty(capacity)
+        self.held = np.empty(capacity, dtype=bool)#selected bodies dont move
+        #each body's trail is a ring buffer, new points overwrite the oldest one once its full
+        self.trail = np.empty((capacity, TRAIL_LENGTH, 2))
+        self.trail_head = np.empty(capacity, dtype=int)#where the next point goes
+        self.trail_count = np.empty(capacity, dtype=int)
+
+    def add(self, x, y, mass, vx, vy, radius):
+        #add a row for a new body and give back its index
+        if self.count == len(self.mass):
+            self.grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.vel[i] = (vx, vy)
+        self.mass[i] = mass
+        self.radius[i] = radius
+        self.held[i] = False
+        self.trail_head[i] = 0
+        self.trail_count[i] = 0
+        self.count += 1
+        return i
+
+    def grow(self):
+        #double the size of every array, keeping the rows we already have
+        capacity = 2 * len(self.mass)
+        for name in ('pos', 'vel', 'mass', 'radius', 'held', 'trail', 'trail_head', 'trail_count'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def update_trails(self, moving):
+        #add the current position to the trail of every moving body thats gone more than
+        #TRAIL_SPACING on either axis since its last trail point, all bodies at once
+        n = self.count
+        rows = np.arange(n)
+        head = self.trail_head[:n]
+        count = self.trail_count[:n]
+        last = self.trail[rows, head - 1]
+        moved = moving & ((count == 0) | (np.abs(last - self.pos[:n]) > TRAIL_SPACING).any(axis=1))
+        self.trail[rows[moved], head[moved]] = self.pos[:n][moved]
+        head[moved] = (head[moved] + 1) % TRAIL_LENGTH
+        np.minimum(count + moved, TRAIL_LENGTH, out=count)
+
+    def clear(self):
+        #remove every body
+        self.count = 0
+
 class Body:
-    def __init__(self, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
-        self.x = float(x)
-        self.y = float(y)
-        self.mass = float(mass)
-        self.vx = float(vx)
-        self.vy = float(vy)
+    #a body is just an index into the BodyStore arrays plus the stuff needed to draw it
+    def __init__(self, store, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
+        self.store = store
+        self.i = store.add(x, y, mass, vx, vy, radius)
         self.radius = radius
         self.color = color
         self.name = name
 
-        self.trail = []
-        self.selected = False
         self.make_glow = False
-
-        self.fx = 0.0
-        self.fy = 0.0
         
     def __str__(self):
         return self.name
 
-    def calculate_force_from(self, other):
-    #calc force w/r to every other body
-        dx = other.x - self.x
-        dy = other.y - self.y
-
-        distance_squared = dx * dx + dy * dy #distance formula
-        distance = max(MIN_DIST, math.sqrt(distance_squared))#forces distance to have a minimum cap
-
-        force_magnitude = G * self.mass * other.mass / (distance**2)#formula for gravitational force f=(Gxm1xm2)/rxr
-
-        fx = force_magnitude * dx / distance
-        fy = force_magnitude * dy / distance
-
-        return fx, fy
-
-    def apply_force(self, fx, fy, dt):
-#apply force: updatw velocity and position
-        if not self.selected:
-            #f=ma -----> a=f/m
-            ax = fx / self.mass
-            ay = fy / self.mass
-            #a=v/t ------> v=axt
-            self.vx += ax * dt
-            self.vy += ay * dt
-            #v=d/t ------> d=vxt
-            self.x += self.vx * dt
-            self.y += self.vy * dt
-
-            self.update_trail()
-
-    def update_trail(self):
-#update planet trails
-        current_pos = (self.x, self.y)
-        if not self.trail or abs(self.trail[-1][0] - self.x) > 2 or abs(self.trail[-1][1] - self.y) > 2:
-            self.trail.append(current_pos)
-
-        if len(self.trail) > 200:
-            self.trail.pop(0)
-
-    def draw(self, screen, camera):
+    #x, y, vx, vy, mass and selected read and write the store arrays
+    @property
+    def x(self):
+        return self.store.pos[self.i, 0]
+
+    @x.setter
+    def x(self, value):
+        self.store.pos[self.i, 0] = value
+
+    @property
+    def y(self):
+        return self.store.pos[self.i, 1]
+
+    @y.setter
+    def y(self, value):
+        self.store.pos[self.i, 1] = value
+
+    @property
+    def vx(self):
+        return self.store.vel[self.i, 0]
+
+    @vx.setter
+    def vx(self, value):
+        self.store.vel[self.i, 0] = value
+
+    @property
+    def vy(self):
+        return self.store.vel[self.i, 1]
+
+    @vy.setter
+    def vy(self, value):
+        self.store.vel[self.i, 1] = value
+
+    @property
+    def mass(self):
+        return self.store.mass[self.i]
+
+    @mass.setter
+    def mass(self, value):
+        self.store.mass[self.i] = value
+
+    @property
+    def selected(self):
+        return self.store.held[self.i]
+
+    @selected.setter
+    def selected(self, value):
+        self.store.held[self.i] = value
+
+    @property
+    def trail_count(self):
+        return self.store.trail_count[self.i]
+
+    def clear_trail(self):
+        self.store.trail_head[self.i] = 0
+        self.store.trail_count[self.i] = 0
+
+    def trail_points(self):
+        #trail points from oldest to newest
+        trail = self.store.trail[self.i]
+        count = self.store.trail_count[self.i]
+        if count < TRAIL_LENGTH:
+            return trail[:count]
+        head = self.store.trail_head[self.i]
+        return np.concatenate((trail[head:], trail[:head]))
+
+    def draw_trail(self, screen, camera):
         # Draw trail
-        if len(self.trail) > 2:
+        if self.trail_count > 2:
             trail_color = tuple(c // 2 for c in self.color)
-            screen_trail = []
-            for world_pos in self.trail:
-                screen_pos = camera.world_to_screen(world_pos[0], world_pos[1])
-                screen_trail.append(screen_pos)
-
-            if len(screen_trail) > 1:
-                for i in range(1, len(screen_trail)):
-                    alpha = i / len(screen_trail)
-                    color = tuple(int(c * alpha) for c in trail_color)
-                    pygame.draw.line(screen, color, screen_trail[i-1], screen_trail[i], 2)
-
-        # Get screen position
-        screen_x, screen_y = camera.world_to_screen(self.x, self.y)
-
-        # Only draw if on screen
-        margin = 100
-        if (-margin < screen_x < WIDTH + margin and -margin < screen_y < HEIGHT + margin):
-            color = SELECT_COLOR if self.selected else self.color
-
-            draw_radius = max(3, int(self.radius * camera.zoom))
-
-            if self.make_glow:#gives glow to a body ,dpesnt work idk
-                for i in range(3):
-                    glow_radius = draw_radius + i * 4
-                    glow_alpha = 100 - i * 30
-                    glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2))
-                    glow_surface.set_alpha(glow_alpha)
-                    pygame.draw.circle(glow_surface, self.color, 
-                                     (glow_radius, glow_radius), glow_radius)
-                    screen.blit(glow_surface, 
-                              (screen_x - glow_radius, screen_y - glow_radius))
-
-            pygame.draw.circle(screen, color, (screen_x, screen_y), draw_radius)
-
-            if self.selected:
-                pygame.draw.circle(screen, SELECT_COLOR, 
-                                 (screen_x, screen_y), draw_radius + 5, 3)
-
-            # Draw name and coordinates
-            if camera.zoom > 0.1:
+            #world to screen for the whole trail in one go
+            screen_trail = ((self.trail_points() + (camera.pan_x, camera.pan_y)) * camera.zoom
+                            + (WIDTH // 2, HEIGHT // 2)).astype(int).tolist()
+
+            #older part of the trail is darker, one polyline per brightness tier
+            #instead of one draw.line per segment
+            segments = len(screen_trail) - 1
+            for tier in range(TRAIL_TIERS):
+                start = tier * segments // TRAIL_TIERS
+                stop = (tier + 1) * segments // TRAIL_TIERS
+                if stop > start:
+                    color = tuple(c * (tier + 1) // TRAIL_TIERS for c in trail_color)
+                    pygame.draw.lines(screen, color, False, screen_trail[start:stop + 1], 2)
+
+    def draw_body(self, screen, camera, screen_x, screen_y):
+        #draw the body itself, the caller has already checked it is on screen
+        color = SELECT_COLOR if self.selected else self.color
+
+        draw_radius = max(3, int(self.radius * camera.zoom))
+
+        if self.make_glow:#gives glow to a body ,dpesnt work idk
+            for i in range(3):
+                glow_radius = draw_radius + i * 4
+                glow_alpha = 100 - i * 30
+                glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2))
+                glow_surface.set_alpha(glow_alpha)
+                pygame.draw.circle(glow_surface, self.color, 
+                                 (glow_radius, glow_radius), glow_radius)
+                screen.blit(glow_surface, 
+                          (screen_x - glow_radius, screen_y - glow_radius))
+
+        disk = get_disk(color, draw_radius)
+        screen.blit(disk, (screen_x - draw_radius - 1, screen_y - draw_radius - 1))
+
+        if self.selected:
+            pygame.draw.circle(screen, SELECT_COLOR, 
+                             (screen_x, screen_y), draw_radius + 5, 3)
+
+        # Draw name and coordinates
+        if camera.zoom > 0.1:
+            name_surface = small_font.render(self.name, True, WHITE)
+            screen.blit(name_surface, (screen_x + draw_radius + 5, screen_y - 10))
+
+            coord_text = f"({int(self.x)}, {int(-self.y)})"
+            coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
+            screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5))
+        # Draw name and coordinates ofbody currently following no matter the zoom level
+        if camera.follow:
+            if camera.follow.name == self.name:
                 name_surface = small_font.render(self.name, True, WHITE)
                 screen.blit(name_surface, (screen_x + draw_radius + 5, screen_y - 10))
 
                 coord_text = f"({int(self.x)}, {int(-self.y)})"
                 coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
                 screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5))
-            # Draw name and coordinates ofbody currently following no matter the zoom level
-            if camera.follow:
-                if camera.follow.name == self.name:
-                    name_surface = small_font.render(self.name, True, WHITE)
-                    screen.blit(name_surface, (screen_x + draw_radius + 5, screen_y - 10))
-
-                    coord_text = f"({int(self.x)}, {int(-self.y)})"
-                    coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
-                    screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5))
-                
+            
+
+_disk_cache = {}#(color, radius) -> filled circle surface, drawn once and then just blitted
+
+def get_disk(color, radius):
+    #filled circle on a colorkeyed surface, centered at (radius + 1, radius + 1)
+    key = (color, radius)
+    disk = _disk_cache.get(key)
+    if disk is None:
+        size = radius * 2 + 2
+        disk = pygame.Surface((size, size))
+        disk.set_colorkey(BLACK, pygame.RLEACCEL)
+        pygame.draw.circle(disk, color, (radius + 1, radius + 1), radius)
+        disk = disk.convert()
+        if len(_disk_cache) > 256:
+            _disk_cache.clear()
+        _disk_cache[key] = disk
+    return disk
 
 def get_optimal_grid_spacing(zoom):
     ##camculate optimal spacing based on zoom level like on those desmos graphing screes
@@ -329,31 +439,171 @@ def get_optimal_grid_spacing(zoom):
 
     return nice_spacing
 
-def apply_mutual_gravity(bodies, dt):
-#applies force of gravity froma and to all bodies
-    for body in bodies:
-        body.fx = 0.0
-        body.fy = 0.0
-
-    for i, body1 in enumerate(bodies):
-        for j, body2 in enumerate(bodies):
-            if i != j:
-                fx, fy = body1.calculate_force_from(body2)
-                body1.fx += fx
-                body1.fy += fy
-
-    for body in bodies:
-        body.apply_force(body.fx, body.fy, dt)
+def gravity_accelerations(x, y, mass, ax, ay):
+#pairwise gravity on flat arrays, writes the accelerations into ax, ay
+#rows go in blocks of BLOCK_SIZE so the temporaries stay small for big n
+#each pair is worked out once (j > i) and pushes body i one way and body j the other
+    gm = (G * mass).astype(np.float32)
+    ax[:] = 0.0
+    ay[:] = 0.0
+    for start in range(0, len(x), BLOCK_SIZE):
+        stop = start + BLOCK_SIZE
+        shape = (min(stop, len(x)) - start, len(x) - start)
+        #differences are taken in float64 so nearby bodies far from the origin keep their precision,
+        #everything after that is float32
+        dx = np.subtract(x[np.newaxis, start:], x[start:stop, np.newaxis], out=np.empty(shape, np.float32), casting='unsafe')
+        dy = np.subtract(y[np.newaxis, start:], y[start:stop, np.newaxis], out=np.empty(shape, np.float32), casting='unsafe')
+        r2 = dx * dx
+        r2 += dy * dy
+        np.maximum(r2, MIN_DIST * MIN_DIST, out=r2)#forces distance to have a minimum cap
+        inv_r = np.sqrt(r2, out=r2)
+        np.divide(1.0, inv_r, out=inv_r)#one divide per pair, then 1/r^3 by multiplies
+        inv_r3 = inv_r * inv_r
+        inv_r3 *= inv_r
+        inv_r3 = np.triu(inv_r3, 1)#only pairs with j > i
+        #a=f/m1 = G*m2/r^2, along dx/r
+        fx = inv_r3 * dx
+        fy = inv_r3 * dy
+        ax[start:stop] += fx @ gm[start:]
+        ay[start:stop] += fy @ gm[start:]
+        ax[start:] -= gm[start:stop] @ fx
+        ay[start:] -= gm[start:stop] @ fy
+
+def three_body_accelerations(x, y, mass, ax, ay):
+#gravity_accelerations written out by hand for exactly 3 bodies (sun, earth, moon after a reset)
+#plain floats are much quicker than array calls when there are only 3 pairs
+    x0, x1, x2 = x.tolist()
+    y0, y1, y2 = y.tolist()
+    m0, m1, m2 = mass.tolist()
+    min_r2 = MIN_DIST * MIN_DIST
+    dx01 = x1 - x0
+    dy01 = y1 - y0
+    dx02 = x2 - x0
+    dy02 = y2 - y0
+    dx12 = x2 - x1
+    dy12 = y2 - y1
+    #G/r^3 for each pair, with the same minimum distance cap
+    r2 = max(min_r2, dx01 * dx01 + dy01 * dy01)
+    s01 = G / (r2 * math.sqrt(r2))
+    r2 = max(min_r2, dx02 * dx02 + dy02 * dy02)
+    s02 = G / (r2 * math.sqrt(r2))
+    r2 = max(min_r2, dx12 * dx12 + dy12 * dy12)
+    s12 = G / (r2 * math.sqrt(r2))
+    ax[0] = m1 * s01 * dx01 + m2 * s02 * dx02
+    ay[0] = m1 * s01 * dy01 + m2 * s02 * dy02
+    ax[1] = m2 * s12 * dx12 - m0 * s01 * dx01
+    ay[1] = m2 * s12 * dy12 - m0 * s01 * dy01
+    ax[2] = -m0 * s02 * dx02 - m1 * s12 * dx12
+    ay[2] = -m0 * s02 * dy02 - m1 * s12 * dy12
+
+class QuadTree:
+    #barnes-hut quadtree, each square knows the total mass and center of mass of the bodies inside it
+    #so far away groups of bodies can be treated as one big body
+    MAX_DEPTH = 32  # bodies sitting on top of each other get merged instead of splitting forever
+
+    def __init__(self, cx, cy, half):
+        self.cx = cx
+        self.cy = cy
+        self.half = half
+        self.mass = 0.0
+        self.com_x = 0.0
+        self.com_y = 0.0
+        self.indices = []  # bodies in a leaf (more than one only at MAX_DEPTH)
+        self.children = None
+
+    @classmethod
+    def build(cls, x, y, mass):
+        #make a tree big enough to hold every body
+        min_x, max_x = x.min(), x.max()
+        min_y, max_y = y.min(), y.max()
+        half = max(max_x - min_x, max_y - min_y) / 2 or 1.0
+        root = cls((min_x + max_x) / 2, (min_y + max_y) / 2, half)
+        for i, (bx, by, m) in enumerate(zip(x.tolist(), y.tolist(), mass.tolist())):
+            root.insert(i, bx, by, m)
+        return root
+
+    def insert(self, i, x, y, m, depth=0):
+        if self.children is not None:
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        elif self.indices and depth < self.MAX_DEPTH:
+            #leaf already has a body: split it in four and push both bodies down
+            self.children = [QuadTree(self.cx + dx * self.half / 2, self.cy + dy * self.half / 2, self.half / 2)
+                             for dy in (-1, 1) for dx in (-1, 1)]
+            self._child_for(self.com_x, self.com_y).insert(self.indices.pop(), self.com_x, self.com_y, self.mass, depth + 1)
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        else:
+            #empty leaf, or bodies on top of each other at the depth limit
+            self.indices.append(i)
+
+        #update total mass and center of mass
+        total = self.mass + m
+        self.com_x = (self.com_x * self.mass + x * m) / total
+        self.com_y = (self.com_y * self.mass + y * m) / total
+        self.mass = total
+
+    def _child_for(self, x, y):
+        return self.children[(2 if y >= self.cy else 0) + (1 if x >= self.cx else 0)]
+
+    def acceleration(self, i, x, y, theta):
+        #gravity on body i sitting at (x, y)
+        ax = ay = 0.0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.mass == 0 or i in node.indices:
+                continue
+            dx = node.com_x - x
+            dy = node.com_y - y
+            distance_squared = dx * dx + dy * dy
+            #far enough away (width / distance < theta): treat the whole square as one body
+            if node.children is None or 4 * node.half * node.half < theta * theta * distance_squared:
+                inv_d = 1.0 / math.sqrt(max(MIN_DIST * MIN_DIST, distance_squared))
+                f = node.mass * inv_d * inv_d * inv_d
+                ax += f * dx
+                ay += f * dy
+            else:
+                stack.extend(node.children)
+        return G * ax, G * ay
+
+def tree_accelerations(x, y, mass, ax, ay):
+#O(N log N) gravity from a quadtree that is built again every step, same interface as gravity_accelerations
+    root = QuadTree.build(x, y, mass)
+    for i, (bx, by) in enumerate(zip(x.tolist(), y.tolist())):
+        ax[i], ay[i] = root.acceleration(i, bx, by, THETA)
+
+def apply_mutual_gravity(store, dt, steps=1):
+#applies force of gravity from and to all bodies, straight on the store arrays
+    n = store.count
+    if n == 0:
+        return
 
-def get_body_at_position(screen_x, screen_y, bodies, camera):
-#locate body in ingame coords
+    pos = store.pos[:n]
+    vel = store.vel[:n]
+    #direct sum is exact and quicker for few bodies, the tree wins for many
+    if n == 3:
+        kernel = three_body_accelerations
+    elif n > BARNES_HUT_THRESHOLD:
+        kernel = tree_accelerations
+    else:
+        kernel = gravity_accelerations
+    acc = np.empty_like(pos)
+    moving = ~store.held[:n]
+    for _ in range(steps):
+        kernel(pos[:, 0], pos[:, 1], store.mass[:n], acc[:, 0], acc[:, 1])
+        vel[moving] += acc[moving] * dt
+        pos[moving] += vel[moving] * dt
+
+    store.update_trails(moving)
+
+def get_body_at_position(screen_x, screen_y, bodies, pos, radius, camera):
+#locate body in ingame coords, the closest one if the click hits several
     world_x, world_y = camera.screen_to_world(screen_x, screen_y)
 
-    for body in bodies:
-        distance = math.sqrt(math.pow((body.x - world_x),2) + math.pow((body.y - world_y),2))
-        if distance <= body.radius:
-            return body
-    return None
+    distance_squared = (pos[:, 0] - world_x) ** 2 + (pos[:, 1] - world_y) ** 2
+    hits = np.flatnonzero(distance_squared <= radius * radius)
+    if len(hits) == 0:
+        return None
+    return bodies[hits[np.argmin(distance_squared[hits])]]
 
 def draw_cartesian_plane(screen, camera, show_grid=True):
     #draw tge grids with nice lookin spaces
@@ -526,6 +776,10 @@ def draw_planet_creation_dialog(screen, input_boxes):
     for box in input_boxes:
         box.draw(screen)
 
+def no_physics():
+    #physics step used while paused or a dialog is open
+    pass
+
 class OrbitSimulation:
     #main class
     def __init__(self):
@@ -551,22 +805,30 @@ class OrbitSimulation:
         self.creation_input_boxes = []
         self.edit_input_boxes = []
 
+        #physics numbers for every body, self.bodies holds the views used by the ui
+        self.store = BodyStore()
         self.bodies = []
         self.create_sun()
         self.create_earth()
         self.create_moon()
         self.setup_input_boxes()
+        self.refresh_physics_step()
+        #the frame is only drawn again when something could have changed it
+        self.needs_redraw = True
+        self.instructions_surface = self.render_instructions()
+        #(lines, surface) of the last info panel drawn
+        self.info_cache = (None, None)
 
     def create_sun(self):
-        sun = Body(0, 0, 27000000, 0, 0, SUN_RADIUS, YELLOW, "Sun")
+        sun = Body(self.store, 0, 0, 27000000, 0, 0, SUN_RADIUS, YELLOW, "Sun")
         sun.make_glow = True
         self.bodies.append(sun)
     def create_earth(self):
-        earth = Body(40000, 0, 81, 0, 23.24, PLANET_RADIUS, GREEN, "Earth")
+        earth = Body(self.store, 40000, 0, 81, 0, 23.24, PLANET_RADIUS, GREEN, "Earth")
         earth.make_glow = False
         self.bodies.append(earth)
     def create_moon(self):
-        moon = Body(40050, 0, 1, 0, 24.37, 4, GRAY, "Moon")
+        moon = Body(self.store, 40050, 0, 1, 0, 24.37, 4, GRAY, "Moon")
         moon.make_glow = False
         self.bodies.append(moon)
 
@@ -608,9 +870,11 @@ class OrbitSimulation:
             if event.key == pygame.K_RETURN:
                 self.create_planet_from_input()
                 self.creating_planet =False
+                self.refresh_physics_step()
                 return
             if event.key == pygame.K_ESCAPE:
                 self.creating_planet = False
+                self.refresh_physics_step()
                 for box in self.creation_input_boxes:
                     box.active = False
                     box.color = box.color_inactive
@@ -629,11 +893,13 @@ class OrbitSimulation:
                 self.edit_mode = False
                 self.selected_body.selected = False
                 self.selected_body = None
+                self.refresh_physics_step()
                 return    
             if event.key == pygame.K_ESCAPE:
                 self.edit_mode = False
                 self.selected_body.selected = False
                 self.selected_body = None
+                self.refresh_physics_step()
                 for box in self.edit_input_boxes:
                     box.active = False
                     box.color = box.color_inactive
@@ -654,7 +920,7 @@ class OrbitSimulation:
             colors = [BLUE, RED, GREEN, ORANGE, PURPLE, CYAN]
             color = random.choice(colors)
 
-            planet = Body(world_x, world_y, mass, vx, vy, 
+            planet = Body(self.store, world_x, world_y, mass, vx, vy, 
                          1, color, f"Planet-{len(self.bodies)}")
             self.bodies.append(planet)
 
@@ -687,6 +953,7 @@ class OrbitSimulation:
         # let there be light.........handle all events
         for event in pygame.event.get():
             mods=pygame.key.get_mods()
+            self.needs_redraw = True#any input can change what is on screen
             
             if event.type == pygame.QUIT:
                 self.running = False
@@ -713,12 +980,13 @@ class OrbitSimulation:
 
                 elif event.button == 3:
                     mouse_x, mouse_y = event.pos
-                    clicked_body = get_body_at_position(mouse_x, mouse_y, self.bodies, self.camera)
+                    clicked_body = self.body_at(mouse_x, mouse_y)
 
                     if clicked_body :
                         self.edit_mode = True
                         self.selected_body = clicked_body
                         clicked_body.selected = True
+                        self.refresh_physics_step()
 
                         self.edit_input_boxes[0].set_value(clicked_body.mass)
                         self.edit_input_boxes[1].set_value(round(clicked_body.vx, 2))
@@ -728,6 +996,7 @@ class OrbitSimulation:
                     else:
                         world_x, world_y = self.camera.screen_to_world(mouse_x, mouse_y)
                         self.creating_planet = True
+                        self.refresh_physics_step()
 
                         self.creation_input_boxes[0].set_value(int(world_x))
                         self.creation_input_boxes[1].set_value(int(-world_y))
@@ -738,7 +1007,7 @@ class OrbitSimulation:
                             
                 elif event.button ==1:
                         mouse_x, mouse_y = event.pos
-                        clicked_body = get_body_at_position(mouse_x, mouse_y, self.bodies, self.camera)
+                        clicked_body = self.body_at(mouse_x, mouse_y)
                         self.selected_body=clicked_body
                         if clicked_body:
                             self.camera.follow=clicked_body
@@ -756,6 +1025,7 @@ class OrbitSimulation:
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.paused = not self.paused
+                    self.refresh_physics_step()
                 elif event.key == pygame.K_LEFTBRACKET:  # [
                     self.time_scale = max(MIN_TIME_SCALE, self.time_scale / 2)
 
@@ -763,7 +1033,7 @@ class OrbitSimulation:
                     self.time_scale = min(MAX_TIME_SCALE, self.time_scale * 2)
                 elif event.key == pygame.K_c:
                     for body in self.bodies:
-                        body.trail.clear()
+                        body.clear_trail()
                         
                 
                                     
@@ -771,6 +1041,7 @@ class OrbitSimulation:
                 elif event.key == pygame.K_r:
                     if mods==4096:#default mod
                         self.bodies.clear()
+                        self.store.clear()
                         self.create_sun()
                         self.create_earth()
                         self.create_moon()
@@ -779,56 +1050,84 @@ class OrbitSimulation:
                         self.selected_body = None
                         self.paused = True
                         self.time_scale=1.0
+                        self.refresh_physics_step()
                     elif mods==4097:#shift is pressed
                         self.bodies.clear()
+                        self.store.clear()
                         self.camera = Camera()
                         self.edit_mode = False
                         self.selected_body = None
                         self.paused = True
-                        self.time_scale=1.0 
+                        self.time_scale=1.0
+                        self.refresh_physics_step() 
 
                 elif event.key == pygame.K_g:
                     self.show_grid = not self.show_grid
 
+    def body_at(self, mouse_x, mouse_y):
+        #body under the mouse, using the store arrays
+        n = self.store.count
+        return get_body_at_position(mouse_x, mouse_y, self.bodies, self.store.pos[:n], self.store.radius[:n], self.camera)
+
+    def refresh_physics_step(self):
+        #physics_step is what run calls every frame, swapped here whenever
+        #paused, creating_planet or edit_mode change instead of checking them each frame
+        if not self.paused and not self.creating_planet and not self.edit_mode:
+            self.physics_step = self.update_physics
+        else:
+            self.physics_step = no_physics
+
     def update_physics(self):
         #update physics simulation
-        if not self.paused and not self.creating_planet and not self.edit_mode:
-            dt = 0.5*self.time_scale
-            apply_mutual_gravity(self.bodies, dt)
-    
-    
+        #one step of PHYSICS_DT per unit of time scale, so fast forward
+        #takes more steps rather than bigger ones
+        steps = min(MAX_SUBSTEPS, max(1, int(self.time_scale)))
+        dt = PHYSICS_DT*self.time_scale/steps
+        apply_mutual_gravity(self.store, dt, steps)
+        self.needs_redraw = True
 
     def draw(self,fps,mods):
         #display everything
-        self.screen.fill(BLACK)
+        #hot path: attributes used in the loops are read into locals once per frame
+        screen = self.screen
+        camera = self.camera
+        screen.fill(BLACK)
 
         # Draw dynamic cartesian plane
-        draw_cartesian_plane(self.screen, self.camera, self.show_grid)
+        draw_cartesian_plane(screen, camera, self.show_grid)
 
-        for body in self.bodies:
-            body.draw(self.screen, self.camera)
+        #work out which bodies are on screen in one go, trails are drawn for all of them
+        screen_x, screen_y = camera.world_to_screen_array(self.store.pos[:self.store.count])
+        margin = 100
+        visible = ((screen_x > -margin) & (screen_x < WIDTH + margin) & (screen_y > -margin) & (screen_y < HEIGHT + margin)).tolist()
+        screen_x = screen_x.tolist()
+        screen_y = screen_y.tolist()
+        for i, body in enumerate(self.bodies):
+            body.draw_trail(screen, camera)
+            if visible[i]:
+                body.draw_body(screen, camera, screen_x[i], screen_y[i])
 
         self.draw_instructions()
         self.draw_info(fps,mods)
 
         if self.edit_mode and self.selected_body:
-            draw_edit_dialog(self.screen, self.selected_body, self.edit_input_boxes)
+            draw_edit_dialog(screen, self.selected_body, self.edit_input_boxes)
 
         if self.creating_planet:
-            draw_planet_creation_dialog(self.screen, self.creation_input_boxes)
+            draw_planet_creation_dialog(screen, self.creation_input_boxes)
 
-        if not self.creating_planet and not self.edit_mode and not self.camera.dragging:
+        if not self.creating_planet and not self.edit_mode and not camera.dragging:
             mouse_x, mouse_y = pygame.mouse.get_pos()
-            hover_body = get_body_at_position(mouse_x, mouse_y, self.bodies, self.camera)
+            hover_body = self.body_at(mouse_x, mouse_y)
             if hover_body:
-                screen_x, screen_y = self.camera.world_to_screen(hover_body.x, hover_body.y)
-                radius = max(3, int(hover_body.radius * self.camera.zoom))
-                pygame.draw.circle(self.screen, WHITE, (screen_x, screen_y), radius + 3, 2)
+                screen_x, screen_y = camera.world_to_screen(hover_body.x, hover_body.y)
+                radius = max(3, int(hover_body.radius * camera.zoom))
+                pygame.draw.circle(screen, WHITE, (screen_x, screen_y), radius + 3, 2)
 
         pygame.display.flip()
 
-    def draw_instructions(self):
-        #display onstructions
+    def render_instructions(self):
+        #render the instruction text once onto one surface
         instructions = [
             "SPACEBAR: Pause/Resume simulation",
             "Mouse wheel: Zoom ",
@@ -837,11 +1136,19 @@ class OrbitSimulation:
             "LShift + R: Remove all planets","[: Fast Forward , ]: Slow Down"
         ]
 
-        y_offset = 10
-        for instruction in instructions:
-            text_surface = small_font.render(instruction, True, WHITE)
-            self.screen.blit(text_surface, (50, y_offset))
+        text_surfaces = [small_font.render(instruction, True, WHITE) for instruction in instructions]
+        width = max(text.get_width() for text in text_surfaces)
+        surface = pygame.Surface((width, 20 * len(text_surfaces)), pygame.SRCALPHA)
+        y_offset = 0
+        for text_surface in text_surfaces:
+            surface.blit(text_surface, (0, y_offset))
             y_offset += 20
+        #same pixel layout as the window so blitting it every frame is a plain copy
+        return surface.convert_alpha()
+
+    def draw_instructions(self):
+        #display onstructions
+        self.screen.blit(self.instructions_surface, (50, 10))
 
     def draw_info(self,fps,mods):
         #display all info
@@ -896,32 +1203,54 @@ class OrbitSimulation:
             f"Debug Key Mods:{(mods)}"
         ]
 
-        y_offset = HEIGHT - 200
-        
-        
-        for i, line in enumerate(info_lines):
-            if i==0:
-                color =status_color
-            elif i==5:
-                color=YELLOW
-                
-            else :
-                color=WHITE
-            text_surface = small_font.render(line, True, color)
-            self.screen.blit(text_surface, (WIDTH - 200, y_offset))
-            y_offset += 15
+        #the whole panel is one surface, only rebuilt when some line changes,
+        #only the last one is kept since old panels (other fps or speeds) rarely come back
+        key = tuple(info_lines)
+        last_key, info_surface = self.info_cache
+        if key != last_key:
+            text_surfaces = []
+            for i, line in enumerate(info_lines):
+                if i==0:
+                    color =status_color
+                elif i==5:
+                    color=YELLOW
+
+                else :
+                    color=WHITE
+                text_surfaces.append(small_font.render(line, True, color))
+
+            width = max(text.get_width() for text in text_surfaces)
+            height = 15 * (len(text_surfaces) - 1) + text_surfaces[-1].get_height()
+            info_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            y_offset = 0
+            for text_surface in text_surfaces:
+                info_surface.blit(text_surface, (0, y_offset))
+                y_offset += 15
+
+            info_surface = info_surface.convert_alpha()
+            self.info_cache = (key, info_surface)
+
+        self.screen.blit(info_surface, (WIDTH - 200, HEIGHT - 200))
 
     def run(self):
         #main loop to do everything
+        #hot path: bound methods looked up once instead of every frame
+        handle_events = self.handle_events
+        draw = self.draw
+        clock = self.clock
+        get_mods = pygame.key.get_mods
         while self.running:
-            self.handle_events()
-            self.update_physics()
-            self.clock.tick(60)
-            fps=int(self.clock.get_fps())
-            mods=pygame.key.get_mods()
-            self.draw(fps,mods)
-            self.camera.update_follow()
-            self.clock.tick(60)
+            handle_events()
+            self.physics_step()
+            clock.tick(60)
+            fps=int(clock.get_fps())
+            mods=get_mods()
+            if self.needs_redraw:
+                draw(fps,mods)
+                self.needs_redraw = False
+            #camera gets replaced on reset so it is looked up each frame
+            if self.camera.update_follow():
+                self.needs_redraw = True
             
         pygame.quit()
 
@@ -1,6 +1,8 @@
 import pygame
+import numpy as np
 import math
 import random
+import functools
 
 # Initialize Pygame
 pygame.init()
@@ -12,6 +14,13 @@ PLANET_RADIUS = 12
 SUN_RADIUS = 20
 MIN_DIST = 1
 BASE_GRID_SIZE = 50  # Base grid size in pixels
+TRAIL_LENGTH = 200  # trail points kept per body
+TRAIL_TIERS = 3  # trails fade from old to new in this many brightness steps
+TRAIL_SPACING = 2  # world units a body has to move before a new trail point is added
+BARNES_HUT_THRESHOLD = 6000  # above this many bodies gravity uses the quadtree
+THETA = 0.5  # quadtree opening angle, smaller is more accurate but slower
+STEPS_PER_ORBIT_TIME = 20  # a pair needs this many steps per sqrt(r^3 / G(m1+m2)) to stay accurate
+MAX_SUBSTEPS = 64  # most small steps a close pair gets inside one big step
 
 # Zoom and camera constants
 MIN_ZOOM = 0.0000001
@@ -46,6 +55,9 @@ large_font = pygame.font.Font(None, 32)
 input_font = pygame.font.Font(None, 24)
 
 class Camera:# What is this class for i wonder?... ps:its a camer make it move and zooooooom
+    __slots__ = ('zoom', 'pan_x', 'pan_y', 'dragging', 'follow', 'last_mouse_pos',
+                 'offset_x', 'offset_y', 'inv_zoom')
+
     def __init__(self):
         self.zoom = 0.01
         self.pan_x = 0.0
@@ -53,21 +65,25 @@ class Camera:# What is this class for i wonder?... ps:its a camer make it move a
         self.dragging = False
         self.follow = None
         self.last_mouse_pos = (0, 0)
+        self.update_offsets()
     
 #there are two coords system 
 # one is the ingame one where planets are placed ,the cartesian plane eg.(25M units,3K units)
 #second one is the screen coodrs like coords on the window eg.(250px,300px)
+    def update_offsets(self):
+        #screen position of world (0, 0) and 1/zoom, worked out again only when zoom or pan changes
+        #has to be called after changing zoom, pan_x or pan_y
+        self.offset_x = self.pan_x * self.zoom + WIDTH // 2
+        self.offset_y = self.pan_y * self.zoom + HEIGHT // 2
+        self.inv_zoom = 1.0 / self.zoom
+
     def world_to_screen(self, world_x, world_y):
         #converts ingame coords to ingame coords
-        screen_x = (world_x + self.pan_x) * self.zoom + WIDTH // 2
-        screen_y = (world_y + self.pan_y) * self.zoom + HEIGHT // 2
-        return int(screen_x), int(screen_y)
+        return int(world_x * self.zoom + self.offset_x), int(world_y * self.zoom + self.offset_y)
 
     def screen_to_world(self, screen_x, screen_y):
         #Convert screen coords to ingame coords
-        world_x = (screen_x - WIDTH // 2) / self.zoom - self.pan_x
-        world_y = (screen_y - HEIGHT // 2) / self.zoom - self.pan_y
-        return world_x, world_y
+        return (screen_x - self.offset_x) * self.inv_zoom, (screen_y - self.offset_y) * self.inv_zoom
 
     def zoom_at_point(self, mouse_x, mouse_y, zoom_factor):
         #zoom at mouse pointer 
@@ -77,13 +93,16 @@ class Camera:# What is this class for i wonder?... ps:its a camer make it move a
 
             new_zoom = self.zoom * zoom_factor
             self.zoom = max(MIN_ZOOM, min(MAX_ZOOM, new_zoom))
+            self.update_offsets()
 
             new_screen_x, new_screen_y = self.world_to_screen(world_x, world_y)
-            self.pan_x += (mouse_x - new_screen_x) / self.zoom
-            self.pan_y += (mouse_y - new_screen_y) / self.zoom
+            self.pan_x += (mouse_x - new_screen_x) * self.inv_zoom
+            self.pan_y += (mouse_y - new_screen_y) * self.inv_zoom
+            self.update_offsets()
         if self.follow:
             new_zoom = self.zoom * zoom_factor
             self.zoom = max(MIN_ZOOM, min(MAX_ZOOM, new_zoom))
+            self.update_offsets()
 
     def start_drag(self, mouse_pos):
         #start mouse dragging
@@ -96,8 +115,9 @@ class Camera:# What is this class for i wonder?... ps:its a camer make it move a
             dx = mouse_pos[0] - self.last_mouse_pos[0]
             dy = mouse_pos[1] - self.last_mouse_pos[1]
 
-            self.pan_x += dx / self.zoom
-            self.pan_y += dy / self.zoom
+            self.pan_x += dx * self.inv_zoom
+            self.pan_y += dy * self.inv_zoom
+            self.update_offsets()
 
             self.last_mouse_pos = mouse_pos
 
@@ -110,12 +130,16 @@ class Camera:# What is this class for i wonder?... ps:its a camer make it move a
             
             self.pan_x = -self.follow.x 
             self.pan_y = -self.follow.y 
+            self.update_offsets()
     def stop_follow(self):
         self.follow = None
         
 
                 
 class InputBox:#make input box go brrrrrr
+    __slots__ = ('rect', 'color_inactive', 'color_active', 'color', 'text', 'label',
+                 'txt_surface', 'active', 'number_only')
+
     def __init__(self, x, y, w, h, label, default_text='', number_only=True):
         self.rect = pygame.Rect(x, y, w, h)
         self.color_inactive = LIGHT_GRAY
@@ -185,126 +209,238 @@ class InputBox:#make input box go brrrrrr
         self.text = str(value)
         self.txt_surface = input_font.render(self.text, True, WHITE)
 
+class BodyStore:
+    #all the physics numbers live here as arrays, one row per body, so gravity is done for every body at once
+    __slots__ = ('count', 'pos', 'vel', 'mass', 'held', 'acc', 'acc_valid', 'trail', 'trail_head', 'trail_count')
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.pos = np.empty((capacity, 2))
+        self.vel = np.empty((capacity, 2))
+        self.mass = np.empty(capacity)
+        self.held = np.empty(capacity, dtype=bool)#selected bodies dont move
+        self.acc = np.empty((capacity, 2))#acceleration at the current positions, reused by the next step
+        self.acc_valid = False#goes False whenever a body is added or a mass changes
+        #each body's trail is a ring buffer, new points overwrite the oldest one once its full
+        self.trail = np.empty((capacity, TRAIL_LENGTH, 2))
+        self.trail_head = np.empty(capacity, dtype=int)#where the next point goes
+        self.trail_count = np.empty(capacity, dtype=int)
+
+    def add(self, x, y, mass, vx, vy):
+        #add a row for a new body and give back its index
+        if self.count == len(self.mass):
+            self.grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.vel[i] = (vx, vy)
+        self.mass[i] = mass
+        self.held[i] = False
+        self.trail_head[i] = 0
+        self.trail_count[i] = 0
+        self.count += 1
+        self.acc_valid = False
+        return i
+
+    def grow(self):
+        #double the size of every array, keeping the rows we already have
+        capacity = 2 * len(self.mass)
+        for name in ('pos', 'vel', 'mass', 'held', 'acc', 'trail', 'trail_head', 'trail_count'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def update_trails(self, moving, spacing=TRAIL_SPACING):
+        #add the current position to the trail of every moving body thats gone more than spacing
+        #since its last trail point, all bodies at once
+        n = self.count
+        rows = np.arange(n)
+        head = self.trail_head[:n]
+        count = self.trail_count[:n]
+        last = self.trail[rows, head - 1]
+        moved = moving & ((count == 0) | (np.abs(last - self.pos[:n]) > spacing).any(axis=1))
+        self.trail[rows[moved], head[moved]] = self.pos[:n][moved]
+        head[moved] = (head[moved] + 1) % TRAIL_LENGTH
+        np.minimum(count + moved, TRAIL_LENGTH, out=count)
+
+    def clear(self):
+        #remove every body
+        self.count = 0
+        self.acc_valid = False
+
+_glow_cache = {}#(color, draw radius) -> glow surface, so each glow is made once per size
+
+def get_glow(color, draw_radius):
+    #the glow is three see-through rings around a body, drawn once into one surface with
+    #per pixel alpha so its a single blit and no set_alpha copies
+    key = (color, draw_radius)
+    glow = _glow_cache.get(key)
+    if glow is None:
+        radii = [draw_radius + i * 4 for i in range(3)]
+        alphas = [(100 - i * 30) / 255 for i in range(3)]
+        glow_radius = radii[-1]
+        glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
+        #from the outside in, each ring is as see-through as all the layers covering it stacked up
+        clear = 1.0
+        for radius, alpha in reversed(list(zip(radii, alphas))):
+            clear *= 1 - alpha
+            pygame.draw.circle(glow_surface, (*color, round(255 * (1 - clear))),
+                               (glow_radius, glow_radius), radius)
+        glow = _glow_cache[key] = (glow_surface, glow_radius)
+    return glow
+
 class Body:
-    def __init__(self, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
-        self.x = float(x)
-        self.y = float(y)
-        self.mass = float(mass)
-        self.vx = float(vx)
-        self.vy = float(vy)
+    #a body is just an index into the BodyStore arrays plus the stuff needed to draw it
+    #slots instead of a __dict__ per body, attribute lookups in the draw loop are a bit quicker
+    __slots__ = ('store', 'i', 'radius', 'color', 'name', 'name_surface', 'radius_zoom', 'draw_radius',
+                 'make_glow')
+
+    def __init__(self, store, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
+        self.store = store
+        self.i = store.add(x, y, mass, vx, vy)
         self.radius = radius
         self.color = color
         self.name = name
+        self.name_surface = small_font.render(name, True, WHITE)#name never changes
 
-        self.trail = []
-        self.selected = False
-        self.make_glow = False
+        #draw radius only changes with zoom so its kept until the zoom does
+        self.radius_zoom = None
+        self.draw_radius = 0
 
-        self.fx = 0.0
-        self.fy = 0.0
+        self.make_glow = False
         
     def __str__(self):
         return self.name
 
-    def calculate_force_from(self, other):
-    #calc force w/r to every other body
-        dx = other.x - self.x
-        dy = other.y - self.y
-
-        distance_squared = dx * dx + dy * dy #distance formula
-        distance = max(MIN_DIST, math.sqrt(distance_squared))#forces distance to have a minimum cap
-
-        force_magnitude = G * self.mass * other.mass / (distance * distance)#formula for gravitational force f=(Gxm1xm2)/rxr
-
-        fx = force_magnitude * dx / distance
-        fy = force_magnitude * dy / distance
-
-        return fx, fy
-
-    def apply_force(self, fx, fy, dt):
-#apply force: updatw velocity and position
-        if not self.selected:
-            #f=ma -----> a=f/m
-            ax = fx / self.mass
-            ay = fy / self.mass
-            #a=v/t ------> v=axt
-            self.vx += ax * dt
-            self.vy += ay * dt
-            #v=d/t ------> d=vxt
-            self.x += self.vx * dt
-            self.y += self.vy * dt
-
-            self.update_trail()
-
-    def update_trail(self):
-#update planet trails
-        current_pos = (self.x, self.y)
-        if not self.trail or abs(self.trail[-1][0] - self.x) > 2 or abs(self.trail[-1][1] - self.y) > 2:
-            self.trail.append(current_pos)
-
-        if len(self.trail) > 200:
-            self.trail.pop(0)
-
-    def draw(self, screen, camera):
-        # Draw trail
-        if len(self.trail) > 2:
+    #x, y, vx, vy, mass and selected read and write the store arrays
+    @property
+    def x(self):
+        return self.store.pos[self.i, 0]
+
+    @x.setter
+    def x(self, value):
+        self.store.pos[self.i, 0] = value
+
+    @property
+    def y(self):
+        return self.store.pos[self.i, 1]
+
+    @y.setter
+    def y(self, value):
+        self.store.pos[self.i, 1] = value
+
+    @property
+    def vx(self):
+        return self.store.vel[self.i, 0]
+
+    @vx.setter
+    def vx(self, value):
+        self.store.vel[self.i, 0] = value
+
+    @property
+    def vy(self):
+        return self.store.vel[self.i, 1]
+
+    @vy.setter
+    def vy(self, value):
+        self.store.vel[self.i, 1] = value
+
+    @property
+    def mass(self):
+        return self.store.mass[self.i]
+
+    @mass.setter
+    def mass(self, value):
+        self.store.mass[self.i] = value
+        self.store.acc_valid = False
+
+    @property
+    def selected(self):
+        return self.store.held[self.i]
+
+    @selected.setter
+    def selected(self, value):
+        self.store.held[self.i] = value
+
+    @property
+    def trail_count(self):
+        return self.store.trail_count[self.i]
+
+    def get_draw_radius(self, zoom):
+        if zoom != self.radius_zoom:
+            self.radius_zoom = zoom
+            self.draw_radius = max(3, int(self.radius * zoom))
+        return self.draw_radius
+
+    def clear_trail(self):
+        self.store.trail_head[self.i] = 0
+        self.store.trail_count[self.i] = 0
+
+    def trail_points(self):
+        #trail points from oldest to newest
+        trail = self.store.trail[self.i]
+        count = self.store.trail_count[self.i]
+        if count < TRAIL_LENGTH:
+            return trail[:count]
+        head = self.store.trail_head[self.i]
+        return np.concatenate((trail[head:], trail[:head]))
+
+    def draw_trail(self, screen, camera):
+        #gives back the rects it drew on so only those parts of the window get updated
+        rects = []
+        if self.trail_count > 2:
             trail_color = tuple(c // 2 for c in self.color)
-            screen_trail = []
-            for world_pos in self.trail:
-                screen_pos = camera.world_to_screen(world_pos[0], world_pos[1])
-                screen_trail.append(screen_pos)
-
-            if len(screen_trail) > 1:
-                for i in range(1, len(screen_trail)):
-                    alpha = i / len(screen_trail)
-                    color = tuple(int(c * alpha) for c in trail_color)
-                    pygame.draw.line(screen, color, screen_trail[i-1], screen_trail[i], 2)
-
-        # Get screen position
-        screen_x, screen_y = camera.world_to_screen(self.x, self.y)
-
-        # Only draw if on screen
-        margin = 100
-        if (-margin < screen_x < WIDTH + margin and -margin < screen_y < HEIGHT + margin):
-            color = SELECT_COLOR if self.selected else self.color
-
-            draw_radius = max(3, int(self.radius * camera.zoom))
-
-            if self.make_glow:#gives glow to a body ,dpesnt work idk
-                for i in range(3):
-                    glow_radius = draw_radius + i * 4
-                    glow_alpha = 100 - i * 30
-                    glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2))
-                    glow_surface.set_alpha(glow_alpha)
-                    pygame.draw.circle(glow_surface, self.color, 
-                                     (glow_radius, glow_radius), glow_radius)
-                    screen.blit(glow_surface, 
-                              (screen_x - glow_radius, screen_y - glow_radius))
-
-            pygame.draw.circle(screen, color, (screen_x, screen_y), draw_radius)
-
-            if self.selected:
-                pygame.draw.circle(screen, SELECT_COLOR, 
-                                 (screen_x, screen_y), draw_radius + 5, 3)
-
-            # Draw name and coordinates
-            if camera.zoom > 0.1:
-                name_surface = small_font.render(self.name, True, WHITE)
-                screen.blit(name_surface, (screen_x + draw_radius + 5, screen_y - 10))
+            #world to screen for the whole trail in one go
+            offset = (camera.offset_x, camera.offset_y)
+            screen_trail = (self.trail_points() * camera.zoom + offset).astype(np.int32).tolist()
+
+            #older part of the trail is darker, one polyline per brightness tier
+            #instead of one draw.line per segment
+            segments = len(screen_trail) - 1
+            screen.lock()
+            for tier in range(TRAIL_TIERS):
+                start = tier * segments // TRAIL_TIERS
+                stop = (tier + 1) * segments // TRAIL_TIERS
+                if stop > start:
+                    color = tuple(c * (tier + 1) // TRAIL_TIERS for c in trail_color)
+                    rects.append(pygame.draw.lines(screen, color, False, screen_trail[start:stop + 1], 2))
+            screen.unlock()
+        return rects
+
+    def draw_body(self, screen, camera, screen_x, screen_y):
+        #draw the body itself at its screen position, gives back the rects it drew on
+        rects = []
+        color = SELECT_COLOR if self.selected else self.color
+
+        draw_radius = self.get_draw_radius(camera.zoom)
+
+        if self.make_glow:#gives glow to a body ,dpesnt work idk
+            glow_surface, glow_radius = get_glow(self.color, draw_radius)
+            rects.append(screen.blit(glow_surface, 
+                      (screen_x - glow_radius, screen_y - glow_radius)))
+
+        rects.append(pygame.draw.circle(screen, color, (screen_x, screen_y), draw_radius))
+
+        if self.selected:
+            rects.append(pygame.draw.circle(screen, SELECT_COLOR, 
+                             (screen_x, screen_y), draw_radius + 5, 3))
+
+        # Draw name and coordinates
+        if camera.zoom > 0.1:
+            rects.append(screen.blit(self.name_surface, (screen_x + draw_radius + 5, screen_y - 10)))
+
+            coord_text = f"({int(self.x)}, {int(-self.y)})"
+            coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
+            rects.append(screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5)))
+        # Draw name and coordinates ofbody currently following no matter the zoom level
+        if camera.follow:
+            if camera.follow.name == self.name:
+                rects.append(screen.blit(self.name_surface, (screen_x + draw_radius + 5, screen_y - 10)))
 
                 coord_text = f"({int(self.x)}, {int(-self.y)})"
                 coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
-                screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5))
-            # Draw name and coordinates ofbody currently following no matter the zoom level
-            if camera.follow:
-                if camera.follow.name == self.name:
-                    name_surface = small_font.render(self.name, True, WHITE)
-                    screen.blit(name_surface, (screen_x + draw_radius + 5, screen_y - 10))
-
-                    coord_text = f"({int(self.x)}, {int(-self.y)})"
-                    coord_surface = small_font.render(coord_text, True, LIGHT_GRAY)
-                    screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5))
-                
+                rects.append(screen.blit(coord_surface, (screen_x + draw_radius + 5, screen_y + 5)))
+        return rects
 
 def get_optimal_grid_spacing(zoom):
     ##camculate optimal spacing based on zoom level like on those desmos graphing screes
@@ -329,21 +465,184 @@ def get_optimal_grid_spacing(zoom):
 
     return nice_spacing
 
-def apply_mutual_gravity(bodies, dt):
-#applies force of gravity froma and to all bodies
-    for body in bodies:
-        body.fx = 0.0
-        body.fy = 0.0
-
-    for i, body1 in enumerate(bodies):
-        for j, body2 in enumerate(bodies):
-            if i != j:
-                fx, fy = body1.calculate_force_from(body2)
-                body1.fx += fx
-                body1.fy += fy
-
-    for body in bodies:
-        body.apply_force(body.fx, body.fy, dt)
+class QuadTree:
+    #barnes-hut quadtree, each square knows the total mass and center of mass of the bodies inside it
+    #so far away groups of bodies can be treated as one big body
+    MAX_DEPTH = 32  # bodies sitting on top of each other get merged instead of splitting forever
+
+    def __init__(self, cx, cy, half):
+        self.cx = cx
+        self.cy = cy
+        self.half = half
+        self.mass = 0.0
+        self.com_x = 0.0
+        self.com_y = 0.0
+        self.indices = []  # bodies in a leaf (more than one only at MAX_DEPTH)
+        self.children = None
+
+    @classmethod
+    def build(cls, pos, mass):
+        #make a tree big enough to hold every body
+        min_x, min_y = pos.min(axis=0)
+        max_x, max_y = pos.max(axis=0)
+        half = max(max_x - min_x, max_y - min_y) / 2 or 1.0
+        root = cls((min_x + max_x) / 2, (min_y + max_y) / 2, half)
+        for i, ((x, y), m) in enumerate(zip(pos.tolist(), mass.tolist())):
+            root.insert(i, x, y, m)
+        return root
+
+    def insert(self, i, x, y, m, depth=0):
+        if self.children is not None:
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        elif self.indices and depth < self.MAX_DEPTH:
+            #leaf already has a body: split it in four and push both bodies down
+            self.children = [QuadTree(self.cx + dx * self.half / 2, self.cy + dy * self.half / 2, self.half / 2)
+                             for dy in (-1, 1) for dx in (-1, 1)]
+            self._child_for(self.com_x, self.com_y).insert(self.indices.pop(), self.com_x, self.com_y, self.mass, depth + 1)
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        else:
+            #empty leaf, or bodies on top of each other at the depth limit
+            self.indices.append(i)
+
+        #update total mass and center of mass
+        total = self.mass + m
+        self.com_x = (self.com_x * self.mass + x * m) / total
+        self.com_y = (self.com_y * self.mass + y * m) / total
+        self.mass = total
+
+    def _child_for(self, x, y):
+        return self.children[(2 if y >= self.cy else 0) + (1 if x >= self.cx else 0)]
+
+    def acceleration(self, i, x, y, theta):
+        #gravity on body i sitting at (x, y)
+        ax = ay = 0.0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.mass == 0 or i in node.indices:
+                continue
+            dx = node.com_x - x
+            dy = node.com_y - y
+            distance_squared = dx * dx + dy * dy
+            #far enough away (width / distance < theta): treat the whole square as one body
+            if node.children is None or 4 * node.half * node.half < theta * theta * distance_squared:
+                inv_d = 1.0 / math.sqrt(max(MIN_DIST * MIN_DIST, distance_squared))
+                f = node.mass * inv_d * inv_d * inv_d
+                ax += f * dx
+                ay += f * dy
+            else:
+                stack.extend(node.children)
+        return G * ax, G * ay
+
+def tree_accelerations(pos, mass):
+    #O(N log N) gravity from a quadtree that is built again every step
+    root = QuadTree.build(pos, mass)
+    acc = np.empty((len(mass), 2))
+    for i, (x, y) in enumerate(pos.tolist()):
+        acc[i] = root.acceleration(i, x, y, THETA)
+    return acc
+
+_pair_indices = {}
+
+def pair_indices(n):
+    #(i, j) index arrays of every pair with i < j, made once per number of bodies
+    pairs = _pair_indices.get(n)
+    if pairs is None:
+        pairs = _pair_indices[n] = np.triu_indices(n, 1)
+    return pairs
+
+def gravity_accelerations(pos, mass):
+    #gravity on every body from every other body, takes and gives back plain arrays only
+    if len(mass) > BARNES_HUT_THRESHOLD:
+        return tree_accelerations(pos, mass)
+    return pair_accelerations(pos, mass, *pair_indices(len(mass)))
+
+def pair_accelerations(pos, mass, i, j):
+    #gravity from just the pairs (i[k], j[k]), each pair is worked out once, dx points from body i to body j
+    n = len(mass)
+    dx = pos[j, 0] - pos[i, 0]
+    dy = pos[j, 1] - pos[i, 1]
+
+    #distance has a minimum cap
+    distance_squared = np.maximum(MIN_DIST * MIN_DIST, dx * dx + dy * dy)
+    #1/r^3 from one square root and multiplies, no pow
+    inv_r = 1.0 / np.sqrt(distance_squared)
+    inv_r3 = inv_r * inv_r * inv_r
+    dx *= inv_r3
+    dy *= inv_r3
+
+    #a=f/m so the bodys own mass cancels out: a_i = G * sum of m_j * d_ij / r^3
+    #newtons third law: the same pair pulls i toward j and j toward i
+    acc = np.empty((n, 2))
+    acc[:, 0] = G * (np.bincount(i, dx * mass[j], n) - np.bincount(j, dx * mass[i], n))
+    acc[:, 1] = G * (np.bincount(i, dy * mass[j], n) - np.bincount(j, dy * mass[i], n))
+    return acc
+
+def gravity_step(pos, vel, mass, acc, moving, dt):
+    #move the bodies picked by the moving mask one velocity verlet step, pos, vel and acc are changed in place
+    #acc has to be the acceleration at the current positions and ends up as the one at the new positions
+    #half a kick, a drift, then the other half kick with the new acceleration
+    vel[moving] += acc[moving] * (0.5 * dt)
+    pos[moving] += vel[moving] * dt
+    acc[:] = gravity_accelerations(pos, mass)
+    vel[moving] += acc[moving] * (0.5 * dt)
+
+def close_pairs(pos, mass, dt):
+    #find the pairs that are too close for a step of dt and need smaller steps
+    #(like the moon going round the earth), gives back the close pairs
+    #and how many small steps they need
+    i, j = pair_indices(len(mass))
+    dx = pos[j, 0] - pos[i, 0]
+    dy = pos[j, 1] - pos[i, 1]
+    distance_squared = np.maximum(MIN_DIST * MIN_DIST, dx * dx + dy * dy)
+    #orbit time of each pair, squared: r^3 / G(m1+m2)
+    tau_squared = distance_squared * np.sqrt(distance_squared) / (G * (mass[i] + mass[j]))
+    close = tau_squared < (STEPS_PER_ORBIT_TIME * dt) ** 2
+    if not close.any():
+        return None
+    substeps = min(MAX_SUBSTEPS, math.ceil(STEPS_PER_ORBIT_TIME * dt / math.sqrt(tau_squared[close].min())))
+    return (i[close], j[close]), substeps
+
+def gravity_step_split(pos, vel, mass, acc, moving, dt, close, substeps):
+    #same as gravity_step but the close pairs get substeps small verlet steps inside the big one
+    #far pairs: half kick, (close pairs go round in small steps), half kick
+    #the far part is everything minus the close pairs, so it works with the quadtree too
+    n = len(mass)
+    close_acc = pair_accelerations(pos, mass, *close)
+    far_acc = acc - close_acc
+    vel[moving] += far_acc[moving] * (0.5 * dt)
+
+    h = dt / substeps
+    for _ in range(substeps):
+        vel[moving] += close_acc[moving] * (0.5 * h)
+        pos[moving] += vel[moving] * h
+        close_acc = pair_accelerations(pos, mass, *close)
+        vel[moving] += close_acc[moving] * (0.5 * h)
+
+    acc[:] = gravity_accelerations(pos, mass)
+    far_acc = acc - close_acc
+    vel[moving] += far_acc[moving] * (0.5 * dt)
+
+def apply_mutual_gravity(store, dt, trail_spacing=TRAIL_SPACING):
+#applies force of gravity froma and to all bodies, all pairs at once with numpy
+#forces, moving the bodies and their trails are all done on the store arrays in one go,
+#without walking the list of bodies
+    n = store.count
+    if n == 0:
+        return
+    #the acceleration from the last step is reused unless something changed since
+    if not store.acc_valid:
+        store.acc[:n] = gravity_accelerations(store.pos[:n], store.mass[:n])
+        store.acc_valid = True
+    #selected bodies stay put
+    pos, vel, mass, acc = store.pos[:n], store.vel[:n], store.mass[:n], store.acc[:n]
+    moving = ~store.held[:n]
+    split = close_pairs(pos, mass, dt) if n > 1 else None
+    if split:
+        gravity_step_split(pos, vel, mass, acc, moving, dt, *split)
+    else:
+        gravity_step(pos, vel, mass, acc, moving, dt)
+    store.update_trails(moving, trail_spacing)
 
 def get_body_at_position(screen_x, screen_y, bodies, camera):
 #locate body in ingame coords
@@ -355,6 +654,25 @@ def get_body_at_position(screen_x, screen_y, bodies, camera):
             return body
     return None
 
+_label_cache = {}#label text -> rendered label, grid labels repeat a lot while panning
+
+def render_label(text):
+    label = _label_cache.get(text)
+    if label is None:
+        if len(_label_cache) > 512:#dont keep every label ever shown
+            _label_cache.clear()
+        label = _label_cache[text] = small_font.render(text, True, WHITE)
+    return label
+
+def draw_grid_lines(screen, lines, labels):
+    #draw the collected grid lines then their labels on top, and empty the lists for the next axis
+    for color, points in lines.items():
+        if points:
+            pygame.draw.lines(screen, color, False, points, 1)
+            points.clear()
+    screen.blits(labels, False)
+    labels.clear()
+
 def draw_cartesian_plane(screen, camera, show_grid=True):
     #draw tge grids with nice lookin spaces
     if not show_grid:
@@ -375,6 +693,11 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
     origin_screen_x, origin_screen_y = camera.world_to_screen(0, 0)
 
     # Calculate starting positions for grid lines
+    #lines are collected per colour and drawn with one draw.lines each, going up one line
+    #and down the next; the joins are at y=-1 and y=HEIGHT (or x) so they land off screen
+    lines = {GRID_COLOR: [], AXIS_COLOR: []}
+    labels = []
+
     # Vertical lines (for X coordinates)
     first_x_world = math.floor((-WIDTH//2 / camera.zoom - camera.pan_x) / grid_spacing_world) * grid_spacing_world
     x_world = first_x_world
@@ -386,14 +709,18 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
             # Choose color (highlight main axes)
             color = AXIS_COLOR if abs(x_world) < grid_spacing_world * 0.001 else GRID_COLOR
 
-            # Draw vertical line
-            pygame.draw.line(screen, color, (int(x_screen), 0), (int(x_screen), HEIGHT), 1)
+            # Vertical line
+            points = lines[color]
+            if len(points) % 4:
+                points += [(x_screen, HEIGHT), (x_screen, -1)]
+            else:
+                points += [(x_screen, -1), (x_screen, HEIGHT)]
 
             # Draw label if not at origin and spacing is reasonable
             if abs(x_world) > grid_spacing_world * 0.001 and grid_spacing_screen > 25:
                 label_text = format_coordinate_label(x_world)
                 if label_text:
-                    label = small_font.render(label_text, True, WHITE)
+                    label = render_label(label_text)
                     label_rect = label.get_rect()
                     label_rect.centerx = x_screen
                     label_rect.y = 680
@@ -401,10 +728,12 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
 
                     # Don't overlap with origin
                     if abs(x_screen - origin_screen_x) > 30:
-                        screen.blit(label, label_rect)
+                        labels.append((label, label_rect))
 
         x_world += grid_spacing_world
 
+    draw_grid_lines(screen, lines, labels)
+
     # Horizontal lines (for Y coordinates)  
     first_y_world = math.floor((-HEIGHT//2 / camera.zoom - camera.pan_y) / grid_spacing_world) * grid_spacing_world
     y_world = first_y_world
@@ -416,8 +745,12 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
             # Choose color (highlight main axes)
             color = AXIS_COLOR if abs(y_world) < grid_spacing_world * 0.001 else GRID_COLOR
 
-            # Draw horizontal line
-            pygame.draw.line(screen, color, (0, int(y_screen)), (WIDTH, int(y_screen)), 1)
+            # Horizontal line
+            points = lines[color]
+            if len(points) % 4:
+                points += [(WIDTH, y_screen), (-1, y_screen)]
+            else:
+                points += [(-1, y_screen), (WIDTH, y_screen)]
 
             # Draw label if not at origin and spacing is reasonable
             if abs(y_world) > grid_spacing_world * 0.001 and grid_spacing_screen > 25:
@@ -425,17 +758,19 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
                 display_y = -y_world
                 label_text = format_coordinate_label(display_y)
                 if label_text:
-                    label = small_font.render(label_text, True, WHITE)
+                    label = render_label(label_text)
                     label_rect = label.get_rect()
                     label_rect.x = 10
                     label_rect.centery = y_screen
 
                     # Don't overlap with origin
                     if abs(y_screen - origin_screen_y) > 20:
-                        screen.blit(label, label_rect)
+                        labels.append((label, label_rect))
 
         y_world += grid_spacing_world
 
+    draw_grid_lines(screen, lines, labels)
+
     # Draw main axes with thicker lines
     if 0 <= origin_screen_x <= WIDTH:
         pygame.draw.line(screen, AXIS_COLOR, (origin_screen_x, 0), (origin_screen_x, HEIGHT), 2)
@@ -444,19 +779,35 @@ def draw_cartesian_plane(screen, camera, show_grid=True):
 
 def format_coordinate_label(value):
     #shows 2.5M instead of 2500000 to avoid number scaling getting cramped
+    #grid values are added up from floats so they come out a tiny bit different each time,
+    #rounding lets them share a cached label
+    return format_rounded_label(round(value, 3))
+
+@functools.lru_cache(maxsize=512)
+def format_rounded_label(value):
     if abs(value) < 0.01:
         return "0"
     elif abs(value) >= 1000 and abs(value)<1000000:
-        return f"{float(value/1000):.1f}K"
+        return f"{value/1000:.1f}K"
     elif abs(value) >= 1000000 and abs(value)<1000000000:
-        return f"{float(value/1000000):.1f}M"
+        return f"{value/1000000:.1f}M"
     elif abs(value) >=1000000000:
-        return f"{float(value/1000000000):.1f}B"
+        return f"{value/1000000000:.1f}B"
     elif abs(value) >= 1:
         return f"{int(value)}"
     else:
         return f"{value:.1f}"
 
+#dialog text only changes when the body or its velocity does, so the rendered
+#text is kept and reused every frame the dialog is open
+@functools.lru_cache(maxsize=64)
+def render_small(text, color):
+    return small_font.render(text, True, color)
+
+@functools.lru_cache(maxsize=16)
+def render_large(text, color):
+    return large_font.render(text, True, color)
+
 def draw_edit_dialog(screen, body, input_boxes):
     #draw up edit dialog box
     box_width, box_height = 450, 200
@@ -468,7 +819,7 @@ def draw_edit_dialog(screen, body, input_boxes):
     pygame.draw.rect(screen, WHITE, box_rect, 2)
 
     title = body.name
-    title_surface = large_font.render(f"Editing- {title}", True, WHITE)
+    title_surface = render_large(f"Editing- {title}", WHITE)
     screen.blit(title_surface, (box_x + 10, box_y + 10))
 
     current_info = (
@@ -477,7 +828,7 @@ def draw_edit_dialog(screen, body, input_boxes):
     )
 
     
-    info_surface = small_font.render(current_info, True, GREEN)
+    info_surface = render_small(current_info, GREEN)
     screen.blit(info_surface, (box_x + 10, box_y + 50 ))
         
     instructions = [
@@ -488,13 +839,14 @@ def draw_edit_dialog(screen, body, input_boxes):
     y_offset =60
     y_offset += 10
     for instruction in instructions:
-        inst_surface = small_font.render(instruction, True, LIGHT_GRAY)
+        inst_surface = render_small(instruction, LIGHT_GRAY)
         screen.blit(inst_surface, (box_x + 10, box_y + y_offset))
         y_offset += 18
 
     # Draw input boxes
     for box in input_boxes:
         box.draw(screen)
+    return box_rect
 
 def draw_planet_creation_dialog(screen, input_boxes):
     #draw up a planet creation dialog box
@@ -506,7 +858,7 @@ def draw_planet_creation_dialog(screen, input_boxes):
     pygame.draw.rect(screen, DARK_GRAY, dialog_rect)
     pygame.draw.rect(screen, WHITE, dialog_rect, 3)
 
-    title_surface = large_font.render("Create New Planet", True, WHITE)
+    title_surface = render_large("Create New Planet", WHITE)
     screen.blit(title_surface, (dialog_x + 20, dialog_y + 20))
 
     # Instructions
@@ -518,13 +870,14 @@ def draw_planet_creation_dialog(screen, input_boxes):
 
     y_offset = 60
     for instruction in instructions:
-        inst_surface = small_font.render(instruction, True, LIGHT_GRAY)
+        inst_surface = render_small(instruction, LIGHT_GRAY)
         screen.blit(inst_surface, (dialog_x + 20, dialog_y + y_offset))
         y_offset += 20
 
     # Draw all input boxes
     for box in input_boxes:
         box.draw(screen)
+    return dialog_rect
 
 class OrbitSimulation:
     #main class
@@ -549,6 +902,14 @@ class OrbitSimulation:
         self.creation_input_boxes = []
         self.edit_input_boxes = []
 
+        self.store = BodyStore()
+        #grid only gets drawn again when the camera moves, otherwise its copied from here
+        self.grid_surface = pygame.Surface((WIDTH, HEIGHT))
+        self.background_key = None
+        #whats on the window from last frame, only these rects and the new ones need updating
+        self.last_rects = []
+        self.full_redraw = True
+
         self.bodies = []
         self.create_sun()
         self.create_earth()
@@ -556,15 +917,15 @@ class OrbitSimulation:
         self.setup_input_boxes()
 
     def create_sun(self):
-        sun = Body(0, 0, 27000000, 0, 0, SUN_RADIUS, YELLOW, "Sun")
+        sun = Body(self.store, 0, 0, 27000000, 0, 0, SUN_RADIUS, YELLOW, "Sun")
         sun.make_glow = True
         self.bodies.append(sun)
     def create_earth(self):
-        earth = Body(40000, 0, 81, 0, 23.24, PLANET_RADIUS, GREEN, "Earth")
+        earth = Body(self.store, 40000, 0, 81, 0, 23.24, PLANET_RADIUS, GREEN, "Earth")
         earth.make_glow = False
         self.bodies.append(earth)
     def create_moon(self):
-        moon = Body(40050, 0, 1, 0, 24.37, 4, GRAY, "Moon")
+        moon = Body(self.store, 40050, 0, 1, 0, 24.37, 4, GRAY, "Moon")
         moon.make_glow = False
         self.bodies.append(moon)
 
@@ -652,7 +1013,7 @@ class OrbitSimulation:
             colors = [BLUE, RED, GREEN, ORANGE, PURPLE, CYAN]
             color = random.choice(colors)
 
-            planet = Body(world_x, world_y, mass, vx, vy, 
+            planet = Body(self.store, world_x, world_y, mass, vx, vy, 
                          1, color, f"Planet-{len(self.bodies)}")
             self.bodies.append(planet)
 
@@ -689,6 +1050,9 @@ class OrbitSimulation:
             if event.type == pygame.QUIT:
                 self.running = False
 
+            if event.type == pygame.WINDOWEXPOSED:#window was covered up, show all of it again
+                self.full_redraw = True
+
             if self.creating_planet:
                 self.handle_planet_creation(event)
                 continue
@@ -761,7 +1125,7 @@ class OrbitSimulation:
                     self.time_scale = min(MAX_TIME_SCALE, self.time_scale * 2)
                 elif event.key == pygame.K_c:
                     for body in self.bodies:
-                        body.trail.clear()
+                        body.clear_trail()
                         
                 
                                     
@@ -769,6 +1133,7 @@ class OrbitSimulation:
                 elif event.key == pygame.K_r:
                     if mods==4096:#default mod
                         self.bodies.clear()
+                        self.store.clear()
                         self.create_sun()
                         self.create_earth()
                         self.create_moon()
@@ -779,6 +1144,7 @@ class OrbitSimulation:
                         self.time_scale=1.0
                     elif mods==4097:#shift is pressed
                         self.bodies.clear()
+                        self.store.clear()
                         self.camera = Camera()
                         self.edit_mode = False
                         self.selected_body = None
@@ -792,38 +1158,72 @@ class OrbitSimulation:
         #update physics simulation
         if not self.paused and not self.creating_planet and not self.edit_mode:
             dt = 0.5*self.time_scale
-            apply_mutual_gravity(self.bodies, dt)
+            #trail points closer than a pixel apart cant be seen, so when zoomed far out
+            #they are spaced at least a pixel apart on screen
+            trail_spacing = max(TRAIL_SPACING, 1.0 / self.camera.zoom)
+            apply_mutual_gravity(self.store, dt, trail_spacing)
     
     
 
     def draw(self,fps,mods):
         #display everything
-        self.screen.fill(BLACK)
-
-        # Draw dynamic cartesian plane
-        draw_cartesian_plane(self.screen, self.camera, self.show_grid)
+        self.draw_background()
 
-        for body in self.bodies:
-            body.draw(self.screen, self.camera)
+        rects = self.draw_bodies()
 
         self.draw_instructions()
-        self.draw_info(fps,mods)
+        rects.append(self.draw_info(fps,mods))
 
         if self.edit_mode and self.selected_body:
-            draw_edit_dialog(self.screen, self.selected_body, self.edit_input_boxes)
+            rects.append(draw_edit_dialog(self.screen, self.selected_body, self.edit_input_boxes))
 
         if self.creating_planet:
-            draw_planet_creation_dialog(self.screen, self.creation_input_boxes)
+            rects.append(draw_planet_creation_dialog(self.screen, self.creation_input_boxes))
 
         if not self.creating_planet and not self.edit_mode and not self.camera.dragging:
             mouse_x, mouse_y = pygame.mouse.get_pos()
             hover_body = get_body_at_position(mouse_x, mouse_y, self.bodies, self.camera)
             if hover_body:
                 screen_x, screen_y = self.camera.world_to_screen(hover_body.x, hover_body.y)
-                radius = max(3, int(hover_body.radius * self.camera.zoom))
-                pygame.draw.circle(self.screen, WHITE, (screen_x, screen_y), radius + 3, 2)
+                radius = hover_body.get_draw_radius(self.camera.zoom)
+                rects.append(pygame.draw.circle(self.screen, WHITE, (screen_x, screen_y), radius + 3, 2))
+
+        #whole window only when the background changed, otherwise just
+        #where things were drawn this frame and last frame
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(rects + self.last_rects)
+        self.last_rects = rects
+
+    def draw_bodies(self):
+        #trails first, then only the bodies that are on screen (or close to it)
+        rects = []
+        for body in self.bodies:
+            rects += body.draw_trail(self.screen, self.camera)
 
-        pygame.display.flip()
+        #screen positions of every body at once, then skip the ones off screen
+        n = self.store.count
+        camera = self.camera
+        screen_pos = self.store.pos[:n] * camera.zoom + (camera.offset_x, camera.offset_y)
+        margin = 100
+        on_screen = ((screen_pos > -margin) & (screen_pos < (WIDTH + margin, HEIGHT + margin))).all(axis=1)
+        for i in np.flatnonzero(on_screen):
+            screen_x, screen_y = screen_pos[i].astype(int).tolist()
+            rects += self.bodies[i].draw_body(self.screen, camera, screen_x, screen_y)
+        return rects
+
+    def draw_background(self):
+        #grid (or plain black) behind everything, the grid is only drawn again when the camera moves
+        key = (self.show_grid, self.camera.zoom, round(self.camera.pan_x, 2), round(self.camera.pan_y, 2))
+        if key != self.background_key:
+            self.background_key = key
+            self.full_redraw = True
+            self.grid_surface.fill(BLACK)
+            # Draw dynamic cartesian plane
+            draw_cartesian_plane(self.grid_surface, self.camera, self.show_grid)
+        self.screen.blit(self.grid_surface, (0, 0))
 
     def draw_instructions(self):
         #display onstructions
@@ -887,6 +1287,7 @@ class OrbitSimulation:
         ]
 
         y_offset = HEIGHT - 200
+        info_rect = pygame.Rect(WIDTH - 200, y_offset, 0, 0)
         
         
         for i, line in enumerate(info_lines):
@@ -898,8 +1299,9 @@ class OrbitSimulation:
             else :
                 color=WHITE
             text_surface = small_font.render(line, True, color)
-            self.screen.blit(text_surface, (WIDTH - 200, y_offset))
+            info_rect.union_ip(self.screen.blit(text_surface, (WIDTH - 200, y_offset)))
             y_offset += 15
+        return info_rect
 
     def run(self):
         #main loop to do everything
@@ -1,4 +1,5 @@
 import pygame
+import numpy as np
 import math
 import random
 from pygame import gfxdraw  # AA circles
@@ -12,6 +13,10 @@ G = 0.8
 PLANET_RADIUS = 12
 SUN_RADIUS = 20
 MIN_DIST = 1
+BARNES_HUT_THRESHOLD = 2500  # above this many bodies gravity uses the quadtree
+THETA = 0.5  # quadtree opening angle, smaller is more accurate but slower
+TRAIL_LENGTH = 200  # points kept per trail
+TRAIL_BUCKETS = 8  # trail fade steps, one line strip each
 BASE_GRID_SIZE = 50  # Base grid size in pixels
 
 # Zoom and camera constants
@@ -93,6 +98,14 @@ class Camera:  # camera with dynamic viewport
         screen_y = (world_y + self.pan_y) * self.zoom + self.height // 2
         return int(screen_x), int(screen_y)
 
+    def world_to_screen_array(self, points):
+        """world_to_screen for an (n, 2) array of points, as an int array."""
+        points = np.asarray(points, dtype=float)
+        screen = np.empty(points.shape, dtype=int)
+        screen[:, 0] = (points[:, 0] + self.pan_x) * self.zoom + self.width // 2
+        screen[:, 1] = (points[:, 1] + self.pan_y) * self.zoom + self.height // 2
+        return screen
+
     def screen_to_world(self, screen_x, screen_y):
         world_x = (screen_x - self.width // 2) / self.zoom - self.pan_x
         world_y = (screen_y - self.height // 2) / self.zoom - self.pan_y
@@ -211,6 +224,9 @@ class InputBox:  # make input box go brrrrrr
 
 
 class Body:
+    # the three glow layers keyed by (colour, glow size), shared by all bodies
+    _glow_cache = {}
+
     def __init__(self, x, y, mass, vx=0, vy=0, radius=PLANET_RADIUS, color=BLUE, name="Body"):
         self.x = float(x)
         self.y = float(y)
@@ -220,55 +236,72 @@ class Body:
         self.radius = radius
         self.color = color
         self.name = name
-
-        self.trail = []
+        # trail fades from black up to half the body colour, one colour per bucket
+        trail_color = tuple(c // 2 for c in color)
+        self._trail_palette = [tuple(int(c * (k + 1) / TRAIL_BUCKETS) for c in trail_color)
+                               for k in range(TRAIL_BUCKETS)]
+
+        # ring buffer of trail points: trail_head is the next slot to write,
+        # trail_len how many slots are filled (float64 like the body positions,
+        # float32 runs out of precision far from the origin at high zoom)
+        self.trail = np.empty((TRAIL_LENGTH, 2))
+        self.trail_head = 0
+        self.trail_len = 0
         self.selected = False
         self.make_glow = False
 
-        self.fx = 0.0
-        self.fy = 0.0
-
     def __str__(self):
         return self.name
 
-    def calculate_force_from(self, other):
-        dx = other.x - self.x
-        dy = other.y - self.y
-        distance_squared = dx * dx + dy * dy
-        distance = max(MIN_DIST, math.sqrt(distance_squared))
-        force_magnitude = G * self.mass * other.mass / (distance * distance)
-        fx = force_magnitude * dx / distance
-        fy = force_magnitude * dy / distance
-        return fx, fy
-
-    def apply_force(self, fx, fy, dt):
-        if not self.selected:
-            ax = fx / self.mass
-            ay = fy / self.mass
-            self.vx += ax * dt
-            self.vy += ay * dt
-            self.x += self.vx * dt
-            self.y += self.vy * dt
-            self.update_trail()
-
     def update_trail(self):
-        current_pos = (self.x, self.y)
-        if not self.trail or abs(self.trail[-1][0] - self.x) > 2 or abs(self.trail[-1][1] - self.y) > 2:
-            self.trail.append(current_pos)
-        if len(self.trail) > 200:
-            self.trail.pop(0)
+        if self.trail_len:
+            last_x, last_y = self.trail[self.trail_head - 1]
+            if abs(last_x - self.x) <= 2 and abs(last_y - self.y) <= 2:
+                return
+        self.trail[self.trail_head] = (self.x, self.y)
+        self.trail_head = (self.trail_head + 1) % TRAIL_LENGTH
+        self.trail_len = min(self.trail_len + 1, TRAIL_LENGTH)
+
+    def clear_trail(self):
+        self.trail_head = 0
+        self.trail_len = 0
+
+    def trail_points(self):
+        """Trail points oldest first, as an (n, 2) array."""
+        if self.trail_len < TRAIL_LENGTH:
+            return self.trail[:self.trail_len]
+        return np.concatenate((self.trail[self.trail_head:], self.trail[:self.trail_head]))
+
+    def _glow_layers(self, draw_radius):
+        """The three glow circles for a body drawn at draw_radius, built once per 2px of size."""
+        base_radius = (draw_radius + 1) // 2 * 2
+        key = (self.color, base_radius)
+        layers = Body._glow_cache.get(key)
+        if layers is None:
+            layers = []
+            for i in range(3):
+                glow_radius = base_radius + i * 4
+                glow_alpha = 100 - i * 30
+                glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
+                glow_color = (*self.color, max(0, glow_alpha))
+                pygame.draw.circle(glow_surface, glow_color, (glow_radius, glow_radius), glow_radius)
+                layers.append((glow_radius, glow_surface))
+            Body._glow_cache[key] = layers
+        return layers
 
     def draw(self, screen, camera):
         global small_font
         # AA trails
-        if len(self.trail) > 2:
-            trail_color = tuple(c // 2 for c in self.color)
-            screen_trail = [camera.world_to_screen(px, py) for (px, py) in self.trail]
-            if len(screen_trail) > 1:
-                for i in range(1, len(screen_trail)):
-                    alpha = i / len(screen_trail)
-                    color = tuple(int(c * alpha) for c in trail_color)
-                    pygame.draw.aaline(screen, color, screen_trail[i-1], screen_trail[i])
+        if self.trail_len > 2:
+            # one aalines strip per fade bucket instead of one aaline per segment;
+            # neighbouring strips share an end point so the trail stays joined
+            screen_trail = camera.world_to_screen_array(self.trail_points())
+            segments = len(screen_trail) - 1
+            for k, color in enumerate(self._trail_palette):
+                lo = k * segments // TRAIL_BUCKETS
+                hi = (k + 1) * segments // TRAIL_BUCKETS
+                if hi > lo:
+                    pygame.draw.aalines(screen, color, False, screen_trail[lo:hi + 1].tolist())
 
         # Get screen position
         screen_x, screen_y = camera.world_to_screen(self.x, self.y)
@@ -281,12 +314,7 @@ class Body:
             draw_radius = max(3, int(self.radius * camera.zoom))
 
             if self.make_glow:
-                for i in range(3):
-                    glow_radius = draw_radius + i * 4
-                    glow_alpha = 100 - i * 30
-                    glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
-                    glow_color = (*self.color, max(0, glow_alpha))
-                    pygame.draw.circle(glow_surface, glow_color, (glow_radius, glow_radius), glow_radius)
+                for glow_radius, glow_surface in self._glow_layers(draw_radius):
                     screen.blit(glow_surface, (screen_x - glow_radius, screen_y - glow_radius), special_flags=pygame.BLEND_PREMULTIPLIED)
 
             # AA planet
@@ -330,20 +358,157 @@ def get_optimal_grid_spacing(zoom):
     return nice_spacing
 
 
-def apply_mutual_gravity(bodies, dt):
-    for body in bodies:
-        body.fx = 0.0
-        body.fy = 0.0
+_pair_indices = {}
+
+
+def pair_indices(n):
+    """(i, j) index arrays of every pair with i < j, made once per body count."""
+    pairs = _pair_indices.get(n)
+    if pairs is None:
+        pairs = _pair_indices[n] = np.triu_indices(n, 1)
+    return pairs
+
+
+def gravity_accelerations(x, y, mass, ax, ay):
+    """Pairwise gravity on flat x, y, mass arrays, written into ax, ay.
+
+    Each unordered pair is worked out once (Newton's third law): the same
+    dr / r^3 pulls i toward j weighted by m_j and j toward i weighted by m_i.
+    """
+    n = len(mass)
+    i, j = pair_indices(n)
+    # dx[k] points from body i[k] to body j[k]
+    dx = x[j] - x[i]
+    dy = y[j] - y[i]
+    # softened 1/r^3: MIN_DIST^2 is added to r^2 instead of clamping r, so there is
+    # no branch, and one sqrt and one divide give 1/r, the rest is multiplies
+    r2 = dx * dx
+    r2 += dy * dy
+    r2 += MIN_DIST * MIN_DIST
+    inv_r = np.sqrt(r2, out=r2)
+    np.divide(1.0, inv_r, out=inv_r)
+    inv_r3 = inv_r * inv_r
+    inv_r3 *= inv_r
+    dx *= inv_r3
+    dy *= inv_r3
+    # a_i = G * (sum over pairs where i is first of m_j * dr - where i is second of m_i * dr)
+    ax[:] = G * (np.bincount(i, dx * mass[j], n) - np.bincount(j, dx * mass[i], n))
+    ay[:] = G * (np.bincount(i, dy * mass[j], n) - np.bincount(j, dy * mass[i], n))
+
+
+class QuadTree:
+    """Barnes-Hut quadtree over the bodies.
+
+    Each square knows the total mass and center of mass of the bodies inside
+    it, so a far away group of bodies can be treated as one big body.
+    """
+    MAX_DEPTH = 32  # bodies sitting on top of each other get merged instead of splitting forever
+
+    def __init__(self, cx, cy, half):
+        self.cx = cx
+        self.cy = cy
+        self.half = half
+        self.mass = 0.0
+        self.com_x = 0.0
+        self.com_y = 0.0
+        self.indices = []  # bodies in a leaf (more than one only at MAX_DEPTH)
+        self.children = None
+
+    @classmethod
+    def build(cls, x, y, mass):
+        """Build a tree big enough to hold every body."""
+        min_x, max_x = x.min(), x.max()
+        min_y, max_y = y.min(), y.max()
+        half = max(max_x - min_x, max_y - min_y) / 2 or 1.0
+        root = cls((min_x + max_x) / 2, (min_y + max_y) / 2, half)
+        for i, (bx, by, m) in enumerate(zip(x.tolist(), y.tolist(), mass.tolist())):
+            root.insert(i, bx, by, m)
+        return root
+
+    def insert(self, i, x, y, m, depth=0):
+        if self.children is not None:
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        elif self.indices and depth < self.MAX_DEPTH:
+            # leaf already has a body: split it in four and push both bodies down
+            self.children = [QuadTree(self.cx + dx * self.half / 2, self.cy + dy * self.half / 2, self.half / 2)
+                             for dy in (-1, 1) for dx in (-1, 1)]
+            self._child_for(self.com_x, self.com_y).insert(self.indices.pop(), self.com_x, self.com_y, self.mass, depth + 1)
+            self._child_for(x, y).insert(i, x, y, m, depth + 1)
+        else:
+            # empty leaf, or bodies on top of each other at the depth limit
+            self.indices.append(i)
+
+        # update total mass and center of mass
+        total = self.mass + m
+        self.com_x = (self.com_x * self.mass + x * m) / total
+        self.com_y = (self.com_y * self.mass + y * m) / total
+        self.mass = total
+
+    def _child_for(self, x, y):
+        return self.children[(2 if y >= self.cy else 0) + (1 if x >= self.cx else 0)]
+
+    def acceleration(self, i, x, y, theta):
+        """Gravity on body i sitting at (x, y)."""
+        ax = ay = 0.0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.mass == 0 or i in node.indices:
+                continue
+            dx = node.com_x - x
+            dy = node.com_y - y
+            distance_squared = dx * dx + dy * dy
+            # far enough away (width / distance < theta): treat the whole square as one body
+            if node.children is None or 4 * node.half * node.half < theta * theta * distance_squared:
+                inv_d = 1.0 / math.sqrt(distance_squared + MIN_DIST * MIN_DIST)  # same softening as the direct sum
+                f = node.mass * inv_d * inv_d * inv_d
+                ax += f * dx
+                ay += f * dy
+            else:
+                stack.extend(node.children)
+        return G * ax, G * ay
+
+
+
+def tree_accelerations(x, y, mass, ax, ay):
+    """O(n log n) gravity from a quadtree rebuilt every step; same interface as gravity_accelerations."""
+    root = QuadTree.build(x, y, mass)
+    for i, (bx, by) in enumerate(zip(x.tolist(), y.tolist())):
+        ax[i], ay[i] = root.acceleration(i, bx, by, THETA)
+
+
+def compute_accelerations(pos, mass, acc):
+    """Gravity on every body from every other body, written into acc (n, 2)."""
+    # the direct sum is exact and quicker for small n, the tree wins for large n
+    kernel = tree_accelerations if len(mass) > BARNES_HUT_THRESHOLD else gravity_accelerations
+    kernel(pos[:, 0], pos[:, 1], mass, acc[:, 0], acc[:, 1])
+
+
+def apply_mutual_gravity(bodies, pos, vel, mass, held, acc, dt):
+    """Step every body under everyone else's gravity, on the SoA arrays.
+
+    Leapfrog (velocity Verlet): drift with the accelerations left over from
+    the last step, work out the new ones, then kick with the average of the
+    two. acc must hold the accelerations at the current positions on entry
+    and holds them for the new positions on return, so there is still one
+    force evaluation per step. pos/vel are updated in place; the results are
+    copied back onto the Body objects (which the UI and drawing read).
+    """
+    if len(bodies) == 0:
+        return
 
-    for i, body1 in enumerate(bodies):
-        for j, body2 in enumerate(bodies):
-            if i != j:
-                fx, fy = body1.calculate_force_from(body2)
-                body1.fx += fx
-                body1.fy += fy
+    moving = ~held
+    pos[moving] += (vel[moving] + 0.5 * dt * acc[moving]) * dt
+    new_acc = np.empty_like(acc)
+    compute_accelerations(pos, mass, new_acc)
+    vel[moving] += 0.5 * dt * (acc[moving] + new_acc[moving])
+    acc[:] = new_acc
 
-    for body in bodies:
-        body.apply_force(body.fx, body.fy, dt)
+    for i, body in enumerate(bodies):
+        if moving[i]:
+            body.x, body.y = pos[i].tolist()
+            body.vx, body.vy = vel[i].tolist()
+            body.update_trail()
 
 
 def get_body_at_position(screen_x, screen_y, bodies, camera):
@@ -537,6 +702,8 @@ class OrbitSimulation:
         self.edit_input_boxes = []
 
         self.bodies = []
+        # SoA copies of the bodies for the physics, rebuilt when _arrays_dirty is set
+        self._arrays_dirty = True
         self.create_sun()
         self.create_earth()
         self.create_moon()
@@ -559,22 +726,25 @@ class OrbitSimulation:
         sun = Body(0, 0, 27000000, 0, 0, SUN_RADIUS, YELLOW, "Sun")
         sun.make_glow = True
         self.bodies.append(sun)
+        self._arrays_dirty = True
 
     def create_earth(self):
         earth = Body(40000, 0, 81, 0, 23.24, PLANET_RADIUS, GREEN, "Earth")
         earth.make_glow = False
         self.bodies.append(earth)
+        self._arrays_dirty = True
 
     def create_moon(self):
         moon = Body(40050, 0, 1, 0, 24.37, 4, GRAY, "Moon")
         moon.make_glow = False
         self.bodies.append(moon)
+        self._arrays_dirty = True
     def spawn_slingshot(self, preset="jupiter"):
         
 
         # optional: keep existing Sun/Earth/Moon; just clear trails
         for b in self.bodies:
-            b.trail.clear()
+            b.clear_trail()
 
         # find Sun & Earth if present (for nicer naming/follow)
         sun = next((b for b in self.bodies if b.name.lower() == "sun"), None)
@@ -599,6 +769,7 @@ class OrbitSimulation:
                 radius=2, color=PROBE_COLOR, name="Probe-J"
             )
             self.bodies += [jupiter, probe]
+            self._arrays_dirty = True
             self.camera.follow = probe
 
         elif preset == "earth":
@@ -611,6 +782,7 @@ class OrbitSimulation:
                 radius=2, color=PROBE_COLOR, name="Probe-E"
             )
             self.bodies.append(probe)
+            self._arrays_dirty = True
             self.camera.follow = probe
         else:
             return  # unknown preset -> do nothing
@@ -673,6 +845,7 @@ class OrbitSimulation:
                 self.edit_mode = False
                 self.selected_body.selected = False
                 self.selected_body = None
+                self._arrays_dirty = True
                 for box in self.edit_input_boxes:
                     box.active = False
                     box.color = box.color_inactive
@@ -693,6 +866,7 @@ class OrbitSimulation:
 
             planet = Body(world_x, world_y, mass, vx, vy, 1, color, f"Planet-{len(self.bodies)}")
             self.bodies.append(planet)
+            self._arrays_dirty = True
 
             for box in self.creation_input_boxes:
                 box.active = False
@@ -706,6 +880,7 @@ class OrbitSimulation:
                 self.selected_body.mass = max(50, self.edit_input_boxes[0].get_value())
                 self.selected_body.vx = self.edit_input_boxes[1].get_value()
                 self.selected_body.vy = -self.edit_input_boxes[2].get_value()
+                self._arrays_dirty = True
             for box in self.edit_input_boxes:
                 box.active = False
                 box.color = box.color_inactive
@@ -796,6 +971,7 @@ class OrbitSimulation:
                         self.edit_mode = True
                         self.selected_body = clicked_body
                         clicked_body.selected = True
+                        self._arrays_dirty = True
 
                         self.edit_input_boxes[0].set_value(clicked_body.mass)
                         self.edit_input_boxes[1].set_value(round(clicked_body.vx, 2))
@@ -832,6 +1008,7 @@ class OrbitSimulation:
                         if self.selected_body:
                             self.selected_body.selected = False
                             self.selected_body = None
+                            self._arrays_dirty = True
                     else:
                         self.running = False
 
@@ -846,7 +1023,7 @@ class OrbitSimulation:
 
                 elif event.key == pygame.K_c:
                     for body in self.bodies:
-                        body.trail.clear()
+                        body.clear_trail()
                 elif event.key == pygame.K_1 and (mods & pygame.KMOD_SHIFT):
                     self.spawn_slingshot("jupiter")
 
@@ -867,6 +1044,7 @@ class OrbitSimulation:
                         self.time_scale = 1.0
                     elif mods == 1:  # shift is pressed
                         self.bodies.clear()
+                        self._arrays_dirty = True
                         w, h = self.screen.get_size()
                         self.camera = Camera(w, h)
                         self.edit_mode = False
@@ -877,10 +1055,23 @@ class OrbitSimulation:
                 elif event.key == pygame.K_g:
                     self.show_grid = not self.show_grid
 
+    def _sync_arrays(self):
+        """Rebuild the physics arrays from the body list."""
+        self.pos = np.array([(b.x, b.y) for b in self.bodies], dtype=float).reshape(-1, 2)
+        self.vel = np.array([(b.vx, b.vy) for b in self.bodies], dtype=float).reshape(-1, 2)
+        self.mass = np.array([b.mass for b in self.bodies], dtype=float)
+        self.held = np.array([b.selected for b in self.bodies], dtype=bool)
+        # the leapfrog step needs the accelerations at the starting positions
+        self.acc = np.empty_like(self.pos)
+        compute_accelerations(self.pos, self.mass, self.acc)
+        self._arrays_dirty = False
+
     def update_physics(self):
         if not self.paused and not self.creating_planet and not self.edit_mode:
             dt = 0.5 * self.time_scale
-            apply_mutual_gravity(self.bodies, dt)
+            if self._arrays_dirty:
+                self._sync_arrays()
+            apply_mutual_gravity(self.bodies, self.pos, self.vel, self.mass, self.held, self.acc, dt)
 
     def draw(self, fps, mods):
         self.screen.fill(BLACK)